@@ -0,0 +1,38 @@
+# Compares the automatic keep selection against sorting the whole pool
+import random
+import timeit
+
+from multi_dice.keep import choose_keeper
+
+POOLS = [
+    (4, 6, 3),
+    (10, 10, 2),
+    (100, 6, 50),
+    (100, 100, 1),
+    (1000, 1000, 3),
+    (1000, 1000, 500),
+    (1000, 1000, 997),
+    (1000, 6, 500),
+    (1000, 20, 997),
+]
+
+
+def bench_keep(number: int = 2000) -> list:
+    results: list = []
+    for count, sides, keep in POOLS:
+        rolls = [random.randint(1, sides) for _ in range(count)]
+        keeper = choose_keeper(count, sides, keep, True)
+        sort_time = timeit.timeit(lambda: sum(sorted(rolls, reverse=True)[:keep]), number=number)
+        keep_time = timeit.timeit(lambda: keeper(rolls), number=number)
+        results.append({
+            "pool": f"{count}d{sides}k{keep}",
+            "sorted": sort_time,
+            "selected": keep_time,
+            "speedup": sort_time / keep_time,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    for result in bench_keep():
+        print(f"{result['pool']:>14} sorted {result['sorted']:.4f}s selected {result['selected']:.4f}s x{result['speedup']:.2f}")
@@ -0,0 +1,57 @@
+# Memory held by retained roll results, the old __dict__ layout against RollDice
+import sys
+import tracemalloc
+
+import multi_dice
+
+
+# Same attributes the original RollDice kept: plain __dict__, a list of rolls and an eager data dict
+class DictRollDice:
+    def __init__(self, roll: multi_dice.RollDice) -> None:
+        self.dice = roll.dice
+        self.crit_val = roll.crit_val
+        self.rolls = list(roll.rolls)
+        self.value = roll.value
+        self.crit = roll.crit
+        self.average = roll.average
+        self.minimum = roll.minimum
+        self.maximum = roll.maximum
+        self.data = {
+            "die": self.dice,
+            "rolls": self.rolls,
+            "value": self.value,
+            "crit": self.crit,
+            "average": self.average,
+            "minimum": self.minimum,
+            "maximum": self.maximum
+        }
+
+
+def retained_bytes(make, n: int) -> int:
+    tracemalloc.start()
+    results = [make() for _ in range(n)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del results
+    return size
+
+
+def bench_memory(dice: str = "4d6k3+2", n: int = 1_000_000) -> dict:
+    multi_dice.compile_dice(dice).average
+    old = retained_bytes(lambda: DictRollDice(multi_dice.RollDice(dice)), n)
+    new = retained_bytes(lambda: multi_dice.RollDice(dice), n)
+    return {
+        "dice": dice,
+        "results": n,
+        "old_bytes_per_result": old / n,
+        "new_bytes_per_result": new / n,
+        "saving": 1 - new / old,
+    }
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    for dice in ("1d20", "4d6k3+2", "8d6+1d4"):
+        result = bench_memory(dice, n)
+        print(f"{dice:>8} old {result['old_bytes_per_result']:.0f} B new {result['new_bytes_per_result']:.0f} B "
+              f"saving {result['saving']:.0%}")
@@ -0,0 +1,41 @@
+# Measures how long "import multi_dice" takes with python -X importtime and fails over budget
+#
+#   python benchmarks/import_time.py --budget 0.05
+import argparse
+import subprocess
+import sys
+
+# Seconds a cold "import multi_dice" may take, about twice what it takes today
+DEFAULT_BUDGET = 0.05
+
+
+# Cumulative seconds of each top level import in one fresh interpreter
+def import_times(module: str = "multi_dice") -> dict:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    times: dict = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only packages imported directly by the module, not their own imports
+        if not name[1:].startswith("  "):
+            times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def bench_import(repeat: int = 5) -> float:
+    return min(import_times()["multi_dice"] for _ in range(repeat))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="multi_dice import time")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="seconds the import may take")
+    args = parser.parse_args()
+
+    seconds = bench_import()
+    print(f"import multi_dice {seconds * 1e3:.1f}ms (budget {args.budget * 1e3:.0f}ms)")
+    slowest = sorted(import_times().items(), key=lambda item: item[1], reverse=True)[:5]
+    for name, took in slowest:
+        print(f"{name:>28} {took * 1e3:8.1f}ms")
+    sys.exit(seconds > args.budget)
@@ -0,0 +1,37 @@
+# Local load test for AsyncDiceRoller, many concurrent /roll style requests
+import asyncio
+import random
+import sys
+import time
+
+import multi_dice
+
+EXPRESSIONS = ["1d20+5", "a1d20+7", "2d6+3", "8d6", "4d6k3", "1000d1000k500"]
+
+
+async def client(roller: multi_dice.AsyncDiceRoller, requests: int) -> None:
+    for _ in range(requests):
+        await roller.roll(random.choice(EXPRESSIONS))
+
+
+async def load_async(clients: int = 1000, requests: int = 20) -> dict:
+    roller = multi_dice.AsyncDiceRoller()
+    start = time.perf_counter()
+    await asyncio.gather(*(client(roller, requests) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": clients * requests,
+        "seconds": elapsed,
+        "per_second": clients * requests / elapsed,
+        "batches": roller.batches,
+        "latency": roller.stats(),
+    }
+
+
+if __name__ == "__main__":
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    result = asyncio.run(load_async(clients))
+    print(f"{result['requests']} requests in {result['seconds']:.2f}s "
+          f"({result['per_second']:.0f}/s, {result['batches']} batches)")
+    for dice, latency in result["latency"].items():
+        print(f"{dice:>14} p50 {latency['p50'] * 1000:.2f}ms p99 {latency['p99'] * 1000:.2f}ms")
@@ -0,0 +1,94 @@
+# Runs the hot path benchmarks and writes the results as JSON
+#
+#   python benchmarks/run.py --output before.json
+#   python benchmarks/run.py --output after.json --compare before.json
+import argparse
+import json
+import os
+import platform
+import subprocess
+import timeit
+
+import multi_dice
+from bench_keep import bench_keep
+from import_time import bench_import
+from bench_memory import bench_memory
+
+AUDIT_LOG = multi_dice.AuditWriter(os.devnull, seed=0)
+AUDITED_ROLL = multi_dice.RollDice("4d6k3+2d8*3-1d4//2")
+
+CASES = {
+    "RollDice simple": lambda: multi_dice.RollDice("1d20"),
+    "RollDice complex": lambda: multi_dice.RollDice("4d6k3+2d8*3-1d4//2"),
+    "RollDice parenthesized": lambda: multi_dice.RollDice("((1d12+1d6)**2+(3d4-1))*2"),
+    "RollDice advantage": lambda: multi_dice.RollDice("a1d20+5"),
+    "RollDice disadvantage": lambda: multi_dice.RollDice("d1d20+5"),
+    "RollDice best of three": lambda: multi_dice.RollDice("a1d20+5", times=3),
+    "RollDice per roll advantage": lambda: multi_dice.RollDice("A1d20+D1d20"),
+    "RollDice exploding": lambda: multi_dice.RollDice("6d6!"),
+    "RollDice successes": lambda: multi_dice.RollDice("10d10>=7"),
+    "RollDice data": lambda: multi_dice.RollDice("2d6+3").data,
+    "RollDice data json": lambda: json.dumps(AUDITED_ROLL.data),
+    "audit append": lambda: AUDIT_LOG.append(AUDITED_ROLL, 0, 0),
+    "roll": lambda: multi_dice.roll("1d20+5"),
+    "roll large pool": lambda: multi_dice.roll("1000d1000k500"),
+    "roll huge pool": lambda: multi_dice.roll("100000d6k10"),
+    "compile uncached": lambda: multi_dice.CompiledDice("4d6k3+2d8*3-1d4//2"),
+    "validate_expression": lambda: multi_dice.validate_expression("((12+3)*2**3)//5-7"),
+    "roll_many 10000": lambda: multi_dice.roll_many("8d6+1d4", 10000),
+    "roll_many exploding": lambda: multi_dice.roll_many("6d6!", 10000),
+    "distribution 4d6k3": lambda: multi_dice.distribution("4d6k3"),
+    "prob_at_least": lambda: multi_dice.prob_at_least("a2d8+1d6", 15),
+}
+
+
+# Best time per call out of a few repeats
+def time_case(func, repeat: int = 5) -> float:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run(memory_results: int = 100_000) -> dict:
+    return {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "timings": {name: time_case(func) for name, func in CASES.items()},
+        "keep": bench_keep(),
+        "memory": [bench_memory(dice, memory_results) for dice in ("1d20", "4d6k3+2")],
+        "import_seconds": bench_import(),
+    }
+
+
+def compare(results: dict, baseline: dict) -> None:
+    for name, seconds in results["timings"].items():
+        before = baseline.get("timings", {}).get(name)
+        change = f"x{before / seconds:.2f}" if before else "new"
+        print(f"{name:>28} {seconds * 1e6:12.2f}us {change}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="multi_dice benchmarks")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--compare", help="JSON file from an earlier run to compare against")
+    parser.add_argument("--memory-results", type=int, default=100_000, help="results retained for the memory benchmark")
+    args = parser.parse_args()
+
+    results = run(args.memory_results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+    else:
+        compare(results, {})
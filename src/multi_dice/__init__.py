@@ -1 +1,38 @@
-from .dice import *
\ No newline at end of file
+import importlib
+
+from .dice import *
+from .compiled import *
+from .rng import *
+from .instrumentation import *
+from .crit import *
+
+# Engines with heavier dependencies are only imported the first time one of their names is used
+LAZY_MODULES = {
+    "validate": ["ValidateExpression", "validate_expression"],
+    "vectorized": ["roll_many"],
+    "probability": [
+        "Distribution", "distribution", "set_distribution_cache", "distribution_cache_info", "DistributionCache",
+        "prob_at_least", "cdf", "percentile", "compare",
+    ],
+    "montecarlo": ["SimulationResult", "simulate"],
+    "stream": ["StreamRoll", "roll_stream", "aroll_stream"],
+    "service": ["AsyncDiceRoller"],
+    "batch": ["roll_batch"],
+    "canonical": ["canonicalize", "canonical_key"],
+    "audit": ["AuditWriter", "AuditReader", "AuditRecord", "roll_seed"],
+}
+
+LAZY_NAMES = {name: module for module, names in LAZY_MODULES.items() for name in names}
+
+
+def __getattr__(name: str):
+    module = LAZY_NAMES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted({*globals(), *LAZY_NAMES})
@@ -0,0 +1,315 @@
+import mmap
+import os
+import random
+import secrets
+import struct
+import sys
+import threading
+from array import array
+from collections import namedtuple
+
+from .compiled import compile_dice
+from .dice import RollDice
+from .pool import FacePool
+from .rng import StdlibRNG, count_faces
+
+__all__ = ["AuditWriter", "AuditReader", "AuditRecord", "roll_seed"]
+
+MAGIC = b"MDAUDIT1"
+
+DEFAULT_BUFFER_BYTES = 1 << 20
+
+# Every record starts with its total size and kind, so a reader can step over records it does not need
+RECORD_HEAD = struct.Struct("<IB")
+
+# Expression definition: id, then the dice string in UTF-8
+EXPRESSION = struct.Struct("<I")
+
+# Roll: expression id, session seed, offset in the session, crit value, flags and value
+ROLL = struct.Struct("<IQQiBq")
+
+KIND_EXPRESSION = 0
+KIND_ROLL = 1
+
+# Flags of a roll record
+CRIT = 1
+FLOAT_VALUE = 2
+BIG_VALUE = 4
+
+# Faces of each dice term are stored as a count followed by the packed array
+TERM_LENGTH = struct.Struct("<I")
+
+INT64_MIN, INT64_MAX = -1 << 63, (1 << 63) - 1
+
+# One roll read back from the log, term_rolls hold arrays and FacePools like RollDice.term_rolls
+AuditRecord = namedtuple("AuditRecord", ["dice", "seed", "offset", "crit_val", "crit", "value", "term_rolls"])
+
+
+def roll_seed(seed: int, offset: int) -> int:
+    """Seed of the roll at offset in a session, every roll gets its own random.Random stream
+
+    Args:
+        seed (int): 64 bit session seed
+        offset (int): Number of rolls made in the session before this one
+
+    Returns:
+        (int): Seed RollDice is rolled with
+    """
+    return seed << 64 | offset
+
+
+# Audited rolls count the faces of big pools one by one, binomialvariate (Python 3.12+) and NumPy
+# would draw other counts from the same seed depending on where the log is replayed
+class AuditRNG(StdlibRNG):
+    def __init__(self, seed: int) -> None:
+        super().__init__(random.Random(seed))
+
+    def counts(self, count: int, sides: int) -> list:
+        return count_faces(self, count, sides)
+
+
+# Packed arrays in little endian order whatever the machine is
+def little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def encode_value(value) -> tuple:
+    if isinstance(value, float):
+        return FLOAT_VALUE, struct.unpack("<q", struct.pack("<d", value))[0], b""
+    if INT64_MIN <= value <= INT64_MAX:
+        return 0, value, b""
+    # Huge results of "**" go after the faces, the value field holds their length
+    data = value.to_bytes((value.bit_length() + 8) // 8, "little", signed=True)
+    return BIG_VALUE, len(data), data
+
+
+# Appends rolls to a binary log, buffered in memory and written in bulk
+class AuditWriter:
+    def __init__(self, path, seed: int = None, buffer_bytes: int = DEFAULT_BUFFER_BYTES) -> None:
+        """Append only audit log of rolls
+
+        Args:
+            path: Log file, created when missing and appended to when not
+            seed (int): 64 bit session seed, a random one when None
+            buffer_bytes (int): Records are written out once this many bytes are buffered
+        """
+        self.path = path
+        self.seed: int = secrets.randbits(64) if seed is None else seed
+        self.buffer_bytes: int = buffer_bytes
+        self.buffer: bytearray = bytearray()
+        self.lock = threading.Lock()
+        self.expressions: dict = {}
+        self.offset: int = 0
+
+        if os.path.exists(path) and os.path.getsize(path):
+            # Carry on with the ids and offsets already in the file
+            with AuditReader(path) as reader:
+                self.expressions = {dice: number for number, dice in reader.expressions.items()}
+                self.offset = reader.next_offset(self.seed)
+                end = reader.end
+            # A record cut short by a crash is dropped before appending after it
+            self.file = open(path, "r+b")
+            self.file.truncate(end)
+            self.file.seek(end)
+        else:
+            self.file = open(path, "wb")
+            self.file.write(MAGIC)
+
+    def roll(self, dice: str = "1d6", crit: int = 20) -> RollDice:
+        """Rolls dice with the next seed of the session and logs the result
+
+        Args:
+            dice (str): The dice rolling string
+            crit (int): Value that causes critical hit
+
+        Returns:
+            (RollDice): The roll that was logged
+        """
+        with self.lock:
+            offset = self.offset
+            self.offset += 1
+        roll = RollDice(dice, crit, AuditRNG(roll_seed(self.seed, offset)))
+        self.append(roll, self.seed, offset)
+        return roll
+
+    def append(self, roll: RollDice, seed: int, offset: int) -> None:
+        """Logs a RollDice that was rolled with AuditRNG(roll_seed(seed, offset))"""
+        flags, value, big = encode_value(roll.value)
+        if roll.crit:
+            flags |= CRIT
+        faces = b"".join(
+            TERM_LENGTH.pack(len(packed)) + little_endian(packed)
+            for packed in (rolls.counts if isinstance(rolls, FacePool) else rolls for rolls in roll.term_rolls)
+        )
+        body = ROLL.pack(self.expression_id(roll.dice), seed, offset, roll.crit_val, flags, value) + faces + big
+        with self.lock:
+            self.buffer += RECORD_HEAD.pack(RECORD_HEAD.size + len(body), KIND_ROLL) + body
+            if len(self.buffer) >= self.buffer_bytes:
+                self.write()
+
+    # Id of a dice string, defined in the log the first time it is used
+    def expression_id(self, dice: str) -> int:
+        with self.lock:
+            number = self.expressions.get(dice)
+            if number is None:
+                number = self.expressions[dice] = len(self.expressions)
+                body = EXPRESSION.pack(number) + dice.encode()
+                self.buffer += RECORD_HEAD.pack(RECORD_HEAD.size + len(body), KIND_EXPRESSION) + body
+            return number
+
+    def write(self) -> None:
+        self.file.write(self.buffer)
+        self.buffer.clear()
+
+    def flush(self) -> None:
+        """Writes every buffered record to the file"""
+        with self.lock:
+            self.write()
+            self.file.flush()
+
+    def close(self) -> None:
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# Reads an audit log through mmap, records are only decoded when asked for
+class AuditReader:
+    def __init__(self, path) -> None:
+        """Memory mapped view of an audit log written by AuditWriter
+
+        Args:
+            path: Log file
+        """
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if self.map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a dice audit log: {path!r}")
+
+        # Start of every roll record, the dice string of every expression id and the end of the last whole record
+        self.positions: array = array("Q")
+        self.expressions: dict = {}
+        self.end: int = len(MAGIC)
+        self.index()
+
+    # One pass over the record heads, a partly written last record is left out
+    def index(self) -> None:
+        position = len(MAGIC)
+        end = len(self.map)
+        unpack_head = RECORD_HEAD.unpack_from
+        while position + RECORD_HEAD.size <= end:
+            size, kind = unpack_head(self.map, position)
+            if size < RECORD_HEAD.size or position + size > end:
+                break
+            if kind == KIND_ROLL:
+                self.positions.append(position)
+            elif kind == KIND_EXPRESSION:
+                start = position + RECORD_HEAD.size
+                (number,) = EXPRESSION.unpack_from(self.map, start)
+                self.expressions[number] = bytes(self.map[start + EXPRESSION.size:position + size]).decode()
+            position += size
+        self.end = position
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    # Fixed part of roll record i, without its faces
+    def head(self, i: int) -> tuple:
+        return ROLL.unpack_from(self.map, self.positions[i] + RECORD_HEAD.size)
+
+    def __getitem__(self, i: int) -> AuditRecord:
+        position = self.positions[i]
+        size, _ = RECORD_HEAD.unpack_from(self.map, position)
+        number, seed, offset, crit_val, flags, value = ROLL.unpack_from(self.map, position + RECORD_HEAD.size)
+        dice = self.expressions[number]
+        compiled = compile_dice(dice)
+
+        start = position + RECORD_HEAD.size + ROLL.size
+        term_rolls: list = []
+        for term, code in zip(compiled.dice_terms, compiled.typecodes):
+            (length,) = TERM_LENGTH.unpack_from(self.map, start)
+            start += TERM_LENGTH.size
+            packed = array("I" if term.histogram else code)
+            packed.frombytes(self.map[start:start + length * packed.itemsize])
+            if sys.byteorder == "big":
+                packed.byteswap()
+            start += length * packed.itemsize
+            term_rolls.append(FacePool(packed) if term.histogram else packed)
+
+        if flags & FLOAT_VALUE:
+            value = struct.unpack("<d", struct.pack("<q", value))[0]
+        elif flags & BIG_VALUE:
+            value = int.from_bytes(self.map[start:start + value], "little", signed=True)
+        return AuditRecord(dice, seed, offset, crit_val, bool(flags & CRIT), value, tuple(term_rolls))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def scan(self, dice: str = None, crit: bool = None):
+        """Numbers of the roll records matching dice and crit, reading only the fixed part of each record
+
+        Args:
+            dice (str): Only rolls of this dice string
+            crit (bool): Only rolls that did or did not crit
+
+        Yields:
+            (int): Record number, usable with reader[i] and replay(i)
+        """
+        numbers = {number for number, expression in self.expressions.items() if dice is None or expression == dice}
+        unpack = ROLL.unpack_from
+        skip = RECORD_HEAD.size
+        for i, position in enumerate(self.positions):
+            number, _, _, _, flags, _ = unpack(self.map, position + skip)
+            if number in numbers and (crit is None or bool(flags & CRIT) == crit):
+                yield i
+
+    # Offset the next roll of a session continues from
+    def next_offset(self, seed: int) -> int:
+        following = 0
+        for i in range(len(self)):
+            _, record_seed, offset, _, _, _ = self.head(i)
+            if record_seed == seed:
+                following = max(following, offset + 1)
+        return following
+
+    def replay(self, i: int) -> RollDice:
+        """Rolls record i again from its seed
+
+        Args:
+            i (int): Record number
+
+        Returns:
+            (RollDice): The same value, rolls and crit as the logged roll
+        """
+        number, seed, offset, crit_val, _, _ = self.head(i)
+        return RollDice(self.expressions[number], crit_val, AuditRNG(roll_seed(seed, offset)))
+
+    def verify(self, i: int) -> bool:
+        """True when replaying record i gives exactly what was logged"""
+        record = self[i]
+        roll = self.replay(i)
+        return (roll.value == record.value and roll.crit == record.crit
+                and [list(rolls) for rolls in roll.term_rolls] == [list(rolls) for rolls in record.term_rolls])
+
+    def close(self) -> None:
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,63 @@
+from collections import Counter
+
+from .compiled import compile_dice
+from .dice import RollDice
+from .parser import DiceTerm
+from .rng import RNGBackend, as_rng
+
+__all__ = ["roll_batch"]
+
+
+# Serves dice faces out of pools drawn up front, one pool per die size
+class PrefetchedRNG(RNGBackend):
+    def __init__(self, rng, pools: dict) -> None:
+        self.rng = rng
+        self.pools: dict = pools
+        self.positions: dict = dict.fromkeys(pools, 0)
+        self.randint = rng.randint
+        self.getrandbits = rng.getrandbits
+        self.counts = rng.counts
+
+    def faces(self, count: int, sides: int) -> list:
+        start = self.positions.get(sides, 0)
+        faces = self.pools.get(sides, [])[start:start + count]
+        self.positions[sides] = start + len(faces)
+        if len(faces) < count:
+            # Explosions and rerolls draw as many dice as they come up with, past the end of the pool
+            faces = faces + self.rng.faces(count - len(faces), sides)
+        return faces
+
+
+# Faces a single RollDice of the expression will draw, per die size
+def faces_needed(compiled) -> Counter:
+    needed: Counter = Counter()
+    for term in compiled.terms:
+        if isinstance(term, DiceTerm) and not term.histogram and not term.modified:
+            needed[term.sides] += term.count * (2 if term.mode else 1)
+    for sides in needed:
+        needed[sides] *= compiled.times
+    return needed
+
+
+def roll_batch(dice: list, rng=None, crit: int = 20) -> list:
+    """Rolls many dice strings at once, drawing every die of the same size together
+
+    Args:
+        dice (list): Dice rolling strings, repeats are rolled independently
+        rng: Optional random number generator or seed, see as_rng
+        crit (int): Value that causes critical hit
+
+    Returns:
+        (list): RollDice.data dict for every dice string, in input order
+    """
+    rng = as_rng(rng)
+
+    # Compile each distinct expression once and total the faces of every die size
+    needed: Counter = Counter()
+    for expression, repeats in Counter(dice).items():
+        for sides, count in faces_needed(compile_dice(expression)).items():
+            needed[sides] += count * repeats
+    pools = {sides: rng.faces(count, sides) for sides, count in needed.items()}
+
+    prefetched = PrefetchedRNG(rng, pools)
+    return [RollDice(expression, crit, prefetched).data for expression in dice]
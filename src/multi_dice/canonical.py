@@ -0,0 +1,162 @@
+import functools
+import hashlib
+
+from .compiled import DEFAULT_CACHE_SIZE, compile_dice
+from .fold import plain_dice, signed_operands
+from .parser import MAX_DICE, PRECEDENCE, BinOp, Constant, DiceTerm
+
+__all__ = ["canonicalize", "canonical_key"]
+
+# Constants folded by these operators stay ints, "/" would turn them into floats
+FOLDABLE = {"+", "-", "*", "//", "**"}
+
+
+# Same distribution, smaller tree: constants folded and identities dropped
+def simplify(node):
+    if isinstance(node, DiceTerm):
+        # A one sided die always rolls a 1
+        return Constant(node.keep) if node.sides == 1 and not node.modified else node
+    if isinstance(node, Constant):
+        return node
+    if node.op in ("+", "-"):
+        return simplify_sum(node)
+    if node.op == "*":
+        return simplify_product(node)
+
+    left, right = simplify(node.left), simplify(node.right)
+    if isinstance(left, Constant) and isinstance(right, Constant) and node.op in FOLDABLE:
+        try:
+            value = node.func(left.value, right.value)
+        except ZeroDivisionError:
+            value = None
+        if isinstance(value, int):
+            return Constant(value)
+    if node.op == "**" and isinstance(right, Constant) and right.value == 1:
+        return left
+    return BinOp(node.op, left, right)
+
+
+def simplify_sum(node):
+    constant = 0
+    plain: dict = {}
+    operands: list = []
+    for sign, operand in signed_operands(node, 1, simplify, []):
+        if isinstance(operand, Constant):
+            constant += sign * operand.value
+        elif plain_dice(operand):
+            # Plain dice of the same size added together are one bigger pool
+            plain.setdefault((sign, operand.sides), []).append(operand.count)
+        else:
+            operands.append((sign, operand))
+    for (sign, sides), counts in plain.items():
+        operands.extend((sign, DiceTerm(count, sides, count, False)) for count in merge_counts(counts))
+
+    if not operands:
+        return Constant(constant)
+
+    positive = sorted((operand for sign, operand in operands if sign > 0), key=render)
+    negative = sorted((operand for sign, operand in operands if sign < 0), key=render)
+    if constant > 0 or not positive:
+        positive.append(Constant(max(constant, 0)))
+    if constant < 0:
+        negative.append(Constant(-constant))
+
+    tree = positive[0]
+    for operand in positive[1:]:
+        tree = BinOp("+", tree, operand)
+    for operand in negative:
+        tree = BinOp("-", tree, operand)
+    return tree
+
+
+# Dice counts of plain pools of one size, merged up to the dice limit
+def merge_counts(counts: list) -> list:
+    merged: list = []
+    total = 0
+    for count in sorted(counts, reverse=True):
+        if total + count > MAX_DICE:
+            merged.append(total)
+            total = 0
+        total += count
+    merged.append(total)
+    return merged
+
+
+# Factors of a chain of "*"
+def factors(node, out: list) -> list:
+    if isinstance(node, BinOp) and node.op == "*":
+        factors(node.left, out)
+        factors(node.right, out)
+    else:
+        out.append(simplify(node))
+    return out
+
+
+def simplify_product(node):
+    constant = 1
+    operands: list = []
+    for operand in factors(node, []):
+        if isinstance(operand, Constant):
+            constant *= operand.value
+        else:
+            operands.append(operand)
+    if constant == 0:
+        return Constant(0)
+
+    operands.sort(key=render)
+    if constant != 1 or not operands:
+        operands.append(Constant(constant))
+    tree = operands[0]
+    for operand in operands[1:]:
+        tree = BinOp("*", tree, operand)
+    return tree
+
+
+def precedence(node) -> int:
+    return PRECEDENCE[node.op] if isinstance(node, BinOp) else 4
+
+
+# Dice string of a tree with only the parentheses it needs
+def render(node) -> str:
+    if isinstance(node, Constant):
+        return str(node.value) if node.value >= 0 else f"(0-{-node.value})"
+    if isinstance(node, DiceTerm):
+        return repr(node)
+
+    level = PRECEDENCE[node.op]
+    left, right = render(node.left), render(node.right)
+    if precedence(node.left) < level or (node.op == "**" and precedence(node.left) == level):
+        left = f"({left})"
+    if precedence(node.right) < level or (node.op != "**" and precedence(node.right) == level):
+        right = f"({right})"
+    return f"{left}{node.op}{right}"
+
+
+@functools.lru_cache(maxsize=DEFAULT_CACHE_SIZE)
+def canonicalize(dice: str) -> str:
+    """Rewrites a dice string into one canonical form shared by every string with the same distribution
+
+    Operands of "+" and "*" are sorted, plain dice of the same size are merged,
+    constants are folded and "**1", "*1" and "+0" are dropped, so "2+1d6",
+    " 1d6 + 2 " and "1d6+2^1" all become "1d6+2".
+
+    Args:
+        dice (str): The dice rolling string
+
+    Returns:
+        (str): Canonical dice string, rolls the same distribution as dice
+    """
+    compiled = compile_dice(dice)
+    return compiled.mode + render(simplify(compiled.tree))
+
+
+def canonical_key(dice: str) -> str:
+    """Stable hash of the canonical form, the same in every process and Python version
+
+    Args:
+        dice (str): The dice rolling string
+
+    Returns:
+        (str): 32 character hex digest
+    """
+    return hashlib.blake2b(canonicalize(dice).encode(), digest_size=16).hexdigest()
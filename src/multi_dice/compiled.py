@@ -0,0 +1,201 @@
+import functools
+import math
+import time
+
+from . import instrumentation
+
+from .fold import fold
+from .parser import DiceTerm, parse_expression
+from .pmf import Moments, expression_moments
+from .pool import highest_roll, pack_rolls, typecode
+from .rng import as_rng
+
+__all__ = ["CompiledDice", "compile_dice", "set_cache_size", "cache_info", "clear_cache"]
+
+DEFAULT_CACHE_SIZE = 1024
+
+
+# Dice expression parsed and validated once, ready to be rolled many times
+class CompiledDice:
+    def __init__(self, dice: str, times: int = 2) -> None:
+        if times < 1:
+            raise ValueError("times must be at least 1")
+        self.dice: str = dice
+        self.mode: str = ""
+        if dice.startswith("a"):
+            self.mode = "a"
+        elif dice.startswith("d"):
+            self.mode = "d"
+        # Rolls of the whole expression the best/worst is taken from, only with an "a"/"d" prefix
+        self.times: int = times if self.mode else 1
+
+        body: str = (dice.replace("d", "", 1) if self.mode == "d" else dice).replace("a", "")
+
+        tree = parse_expression(body)
+        dice_terms = [term for term in tree.terms() if isinstance(term, DiceTerm)]
+        self.has_dice: bool = bool(dice_terms)
+
+        # Rolls only evaluate the random parts, the last dice term stays apart for crits
+        self.tree = fold(tree, dice_terms[-1] if dice_terms else None)
+        self.terms: list = list(self.tree.terms())
+        self.dice_terms: tuple = tuple(term for term in self.terms if isinstance(term, DiceTerm))
+        self.typecodes: tuple = tuple(typecode(term.sides) for term in self.dice_terms)
+        # Crits are reported for the dice terms as written, merged pools split back into their parts
+        self.crit_terms: tuple = tuple(
+            term if len(term.parts) == 1 else DiceTerm(part, term.sides, part, False)
+            for term in self.dice_terms for part in term.parts
+        )
+
+    # Statistics do not depend on the dice outcome, worked out once on first use
+    @functools.cached_property
+    def moments(self) -> Moments:
+        recorder = instrumentation.recorder.get()
+        if recorder is None:
+            return expression_moments(self.tree, self.mode, self.times)
+        start = time.perf_counter()
+        moments = expression_moments(self.tree, self.mode, self.times)
+        recorder.add_time("stats", time.perf_counter() - start)
+        return moments
+
+    @property
+    def average(self):
+        return self.moments.mean
+
+    @property
+    def minimum(self):
+        return self.moments.minimum
+
+    @property
+    def maximum(self):
+        return self.moments.maximum
+
+    @property
+    def variance(self):
+        return self.moments.variance
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.moments.variance)
+
+    def roll(self, crit_val: int = 20, rng=None) -> tuple:
+        """Rolls every term once, ignoring whole expression advantage
+
+        Args:
+            crit_val (int): Value that causes critical hit
+            rng: Random number generator or seed, see as_rng
+
+        Returns:
+            (tuple): value, list of individual rolls, crit of the last dice term
+        """
+        value, term_rolls, crit = self.roll_terms(crit_val, rng)
+        return value, [roll for rolls in term_rolls for roll in rolls], crit
+
+    # Like roll() but keeps the dice of each term apart, big pools stay as a FacePool
+    def roll_terms(self, crit_val: int = 20, rng=None) -> tuple:
+        recorder = instrumentation.recorder.get()
+        if recorder is not None:
+            return self.roll_terms_recorded(crit_val, as_rng(rng), recorder)
+        term_rolls: list = []
+        value = self.tree.roll(term_rolls, as_rng(rng))
+        crit: bool = self.has_dice and highest_roll(term_rolls[-1]) >= crit_val
+        return value, term_rolls, crit
+
+    # roll_terms() while instrumenting, "roll" includes the time spent in "rng"
+    def roll_terms_recorded(self, crit_val: int, rng, recorder) -> tuple:
+        start = time.perf_counter()
+        term_rolls: list = []
+        value = self.tree.roll(term_rolls, instrumentation.TimedRNG(rng, recorder))
+        crit: bool = self.has_dice and highest_roll(term_rolls[-1]) >= crit_val
+        recorder.add_time("roll", time.perf_counter() - start)
+        recorder.count("rolls")
+        return value, term_rolls, crit
+
+    # Like roll_terms() with whole expression advantage applied, best/worst of times rolls
+    def roll_expression(self, crit_val: int = 20, rng=None) -> tuple:
+        rng = as_rng(rng)
+        best = self.roll_terms(crit_val, rng)
+        highest = self.mode == "a"
+        for _ in range(self.times - 1):
+            roll = self.roll_terms(crit_val, rng)
+            # Ties keep the reroll like RollDice.advantage/disadvantage
+            if (roll[0] >= best[0]) if highest else (roll[0] <= best[0]):
+                best = roll
+        return best
+
+    # Rolls of each term stored as arrays, for results that are kept around
+    def pack(self, term_rolls: list) -> tuple:
+        recorder = instrumentation.recorder.get()
+        if recorder is None:
+            return tuple(pack_rolls(rolls, code) for rolls, code in zip(term_rolls, self.typecodes))
+        start = time.perf_counter()
+        packed = tuple(pack_rolls(rolls, code) for rolls, code in zip(term_rolls, self.typecodes))
+        recorder.add_time("pack", time.perf_counter() - start)
+        return packed
+
+    # Value only, with whole expression advantage applied
+    def roll_value(self, rng=None):
+        rng = as_rng(rng)
+        out: list = []
+        value = self.tree.roll(out, rng)
+        keep = max if self.mode == "a" else min
+        for _ in range(self.times - 1):
+            out.clear()
+            value = keep(value, self.tree.roll(out, rng))
+        return value
+
+    def __repr__(self) -> str:
+        if self.mode and self.times != 2:
+            return f"CompiledDice({self.dice!r}, times={self.times})"
+        return f"CompiledDice({self.dice!r})"
+
+
+def normalize(dice: str) -> str:
+    return dice.replace(" ", "").replace("^", "**")
+
+
+_compile_cached = functools.lru_cache(maxsize=DEFAULT_CACHE_SIZE)(CompiledDice)
+
+
+def compile_dice(dice: str = "1d6", times: int = 2) -> CompiledDice:
+    """Parses a dice string once and returns a reusable compiled roll
+
+    Args:
+        dice (str): Required: '(int)d(int)' Optional parameters:[k(int),('+', '*', '/', '//', '-', '**')(int||roll)]
+        times (int): Rolls an "a"/"d" prefix takes the best/worst of, 3 for elven accuracy
+
+    Returns:
+        CompiledDice
+    """
+    recorder = instrumentation.recorder.get()
+    if recorder is None:
+        return _compile_cached(normalize(dice), times)
+
+    misses = _compile_cached.cache_info().misses
+    start = time.perf_counter()
+    compiled = _compile_cached(normalize(dice), times)
+    if _compile_cached.cache_info().misses == misses:
+        recorder.count("cache_hits")
+    else:
+        recorder.add_time("compile", time.perf_counter() - start)
+        recorder.count("cache_misses")
+        recorder.count("expression_chars", len(compiled.dice))
+        recorder.count("expression_terms", len(compiled.terms))
+    return compiled
+
+
+def set_cache_size(maxsize: int = DEFAULT_CACHE_SIZE) -> None:
+    """Sets how many compiled expressions are kept, clearing the cache
+
+    Args:
+        maxsize (int): Max cached expressions, None for unbounded
+    """
+    global _compile_cached
+    _compile_cached = functools.lru_cache(maxsize=maxsize)(CompiledDice)
+
+
+def cache_info():
+    return _compile_cached.cache_info()
+
+
+def clear_cache() -> None:
+    _compile_cached.cache_clear()
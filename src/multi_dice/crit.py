@@ -0,0 +1,59 @@
+from collections import namedtuple
+
+from .pool import face_tally
+
+__all__ = ["TermCrit", "CritCounts", "term_crits"]
+
+# Crits of one dice term in a single roll, counted in dice
+TermCrit = namedtuple("TermCrit", ["dice", "crit", "crits", "natural_max", "natural_ones"])
+
+
+# Rolls out of trials in which a dice term crit, showed its highest face or showed a 1
+class CritCounts(namedtuple("CritCounts", ["dice", "trials", "crits", "natural_max", "natural_ones"])):
+    __slots__ = ()
+
+    @property
+    def crit_rate(self) -> float:
+        return self.crits / self.trials
+
+    @property
+    def natural_max_rate(self) -> float:
+        return self.natural_max / self.trials
+
+    @property
+    def natural_one_rate(self) -> float:
+        return self.natural_ones / self.trials
+
+    # Counts of a single roll
+    @classmethod
+    def of(cls, crit: TermCrit):
+        return cls(crit.dice, 1, int(crit.crit), int(crit.natural_max > 0), int(crit.natural_ones > 0))
+
+    # Counts of two runs of the same term added together
+    def __add__(self, other):
+        return CritCounts(self.dice, *(mine + theirs for mine, theirs in zip(self[1:], other[1:])))
+
+
+def term_crits(compiled, term_rolls, crit_val: int = 20) -> tuple:
+    """Crits of every dice term of one roll
+
+    Args:
+        compiled (CompiledDice): The expression that was rolled
+        term_rolls: Rolls of each dice term, as returned by CompiledDice.roll_terms
+        crit_val (int): Value that causes critical hit
+
+    Returns:
+        (tuple): TermCrit for each dice term as written, in the order they are rolled
+    """
+    crits: list = []
+    written = iter(compiled.crit_terms)
+    for term, rolls in zip(compiled.dice_terms, term_rolls):
+        start = 0
+        for part in term.parts:
+            # Dice merged at compile time are rolled in written order, each term as written is a slice of the pool
+            part_rolls = rolls[start:start + part] if len(term.parts) > 1 else rolls
+            start += part
+            at_least, highest, ones = face_tally(part_rolls, term.sides, crit_val)
+            crits.append(TermCrit(repr(next(written)), at_least > 0, at_least, highest, ones))
+    return tuple(crits)
+
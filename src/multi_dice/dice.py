@@ -1,178 +1,146 @@
-import ast
-import random
-import re
+from .compiled import CompiledDice, compile_dice
+from .crit import term_crits
+from .parser import DiceTerm, parse_term
+from .pmf import term_moments
+from .pool import highest_roll
+from .rng import as_rng
+
 
 # Class to roll dice and calculate results
 class RollDice:
-    def __init__(self, dice: str = "1d6", crit: int = 20) -> None:
-        dice: str = dice.replace(" ","").replace("^","**")
-        self.dice: str = dice
-        self.crit_val:int  = crit
-
-        # If dice starts with "a", call roll() and advantage()
-        if dice.startswith('a'):
-            self.parse_dice()
-            self.advantage()
-
-        # If dice starts with "d", call roll() and disadvantage()
-        elif dice.startswith('d'):
-            self.parse_dice()
-            self.disadvantage()
-
-        # Otherwise just call roll()
-        else:
-            self.parse_dice()
-
-    # Check dice string for operators
+    __slots__ = ("compiled", "dice", "crit_val", "rng", "value", "term_rolls", "crit", "_rolls", "_data", "_term_crits")
+
+    def __init__(self, dice: str = "1d6", crit: int = 20, rng=None, times: int = 2) -> None:
+        self.compiled: CompiledDice = compile_dice(dice, times)
+        self.dice: str = self.compiled.dice
+        self.crit_val: int = crit
+        self.rng = as_rng(rng)
+
+        self.parse_dice()
+
+    # Roll the compiled expression, keeping the best/worst roll for "a"/"d", everything else is worked out when read
     def parse_dice(self):
-        dice: str = str((self.dice.replace('d', '',1) if self.dice.startswith('d') else self.dice).replace('a', ''))
-        dicecopy: str = str(dice)
-        averagecopy: str = str(dice)
-        minimumcopy: str = str(dice)
-        maximumcopy: str = str(dice)
-        parts: list = re.findall("[^+*/()-]+", dice)
-        self.rolls: list = []
-        for part in parts:
-            if part != '':
-                part_value: dict = self.roll(part)
-                dicecopy: str = dicecopy.replace(part, str(part_value['value']), 1)
-                averagecopy: str = averagecopy.replace(part, str(part_value['average']), 1)
-                minimumcopy: str = minimumcopy.replace(part, str(part_value['minimum']), 1)
-                maximumcopy: str = maximumcopy.replace(part, str(part_value['maximum']), 1)
-
-        validate_expression(dicecopy)
-        validate_expression(averagecopy)
-        validate_expression(minimumcopy)
-        validate_expression(maximumcopy)
-        self.value: int = eval(dicecopy, {}, {})
-        self.average: int = eval(averagecopy, {}, {})
-        self.minimum: int = eval(minimumcopy, {}, {})
-        self.maximum: int = eval(maximumcopy, {}, {})
-        self.data: dict = {
-            "die": self.dice,
-            "rolls": self.rolls,
-            "value": self.value,
-            "crit": self.crit,
-            "average": self.average,
-            "minimum": self.minimum,
-            "maximum": self.maximum
-        }
+        self.value, term_rolls, self.crit = self.compiled.roll_expression(self.crit_val, self.rng)
+        self.term_rolls: tuple = self.compiled.pack(term_rolls)
+        self._rolls = None
+        self._data = None
+        self._term_crits = None
+
+    # Statistics are shared by every roll of the same expression
+    @property
+    def average(self):
+        return self.compiled.average
+
+    @property
+    def minimum(self):
+        return self.compiled.minimum
+
+    @property
+    def maximum(self):
+        return self.compiled.maximum
+
+    @property
+    def variance(self):
+        return self.compiled.variance
+
+    @property
+    def stdev(self):
+        return self.compiled.stdev
+
+    @property
+    def data(self) -> dict:
+        if self._data is None:
+            self._data = {
+                "die": self.dice,
+                "rolls": self.rolls,
+                "value": self.value,
+                "crit": self.crit,
+                "average": self.average,
+                "minimum": self.minimum,
+                "maximum": self.maximum
+            }
+        return self._data
+
+    # Crits of every dice term, whether any die reached crit_val and how many dice showed the highest face and a 1
+    @property
+    def term_crits(self) -> tuple:
+        if self._term_crits is None:
+            self._term_crits = term_crits(self.compiled, self.term_rolls, self.crit_val)
+        return self._term_crits
 
-    # Roll dice and calculate results
+    # Roll a single term and calculate results, a constant leaves the crit of the last dice term alone
     def roll(self, die):
-        if "d" not in die:
-            die = int(die)
-            self.crit = False
-            roll_result = {
-                "value": die,
-                "average": die,
-                "minimum": die,
-                "maximum": die,
+        term = parse_term(die)
+        if not isinstance(term, DiceTerm):
+            return {
+                "value": term.value,
+                "average": term.value,
+                "minimum": term.value,
+                "maximum": term.value,
             }
-            return roll_result
-        
-        split_d = die.split("d")
-
-        # Get number of dice and sides
-        rolladvantage = False
-        rolldisadvantage = False
-        if split_d[0].startswith("A"):
-            rolladvantage = True
-            split_d[0] = split_d[0][1:]
-        elif split_d[0].startswith("D"):
-            rolldisadvantage = True
-            split_d[0] = split_d[0][1:]
-
-        number_of_dice = int(split_d[0])
-        die_sides = split_d[1]
-
-        # Check for keeping highest/lowest rolls
-        k_value = number_of_dice
-
-        reverse_sort = False
-        if "k" in die_sides:
-            die_sides, k_value = die_sides.split("k")
-            k_value = int(k_value)
-            reverse_sort = True
-        elif "l" in die_sides:
-            die_sides, k_value = die_sides.split("l")
-            k_value = int(k_value)
-
-        die_sides = int(die_sides)
-
-        # Validate inputs
-        if number_of_dice > 1000 or die_sides > 1000 or k_value > number_of_dice:
-            raise ValueError
-
-        # Roll dice
-        self.crit = False
-        rolls = []
-        for c in range(number_of_dice):
-            roll = random.randint(1, die_sides)
-            self.crit = True if roll >= self.crit_val else self.crit
-            rolls.append(roll)
-        total = sum(sorted(rolls, reverse=reverse_sort)[:k_value])
-
-        if rolladvantage or rolldisadvantage:
-            secondrolls = []
-            for c in range(number_of_dice):
-                roll = random.randint(1, die_sides)
-                secondcrit = True if roll >= self.crit_val else self.crit
-                secondrolls.append(roll)
-            secondtotal = sum(sorted(secondrolls, reverse=reverse_sort)[:k_value])
-
-            if rolladvantage and secondtotal > total:
-                total = secondtotal
-                rolls = secondrolls
-                self.crit = secondcrit
-
-            elif rolldisadvantage and secondtotal < total:
-                total = secondtotal
-                rolls = secondrolls
-                self.crit = secondcrit
-
-        for value in rolls:
-            self.rolls.append(value)
+
+        out: list = []
+        total = term.roll(out, self.rng)
+        self.crit = highest_roll(out[0]) >= self.crit_val
+        self.rolls.extend(out[0])
 
         # Calculate results
+        moments = term_moments(*term.key)
         roll_result = {
-            "value":total,
-            "average":(k_value * die_sides + 1) / 2,
-            "minimum": k_value,
-            "maximum": k_value * die_sides,
+            "value": total,
+            "average": moments.mean,
+            "minimum": moments.minimum,
+            "maximum": moments.maximum,
         }
         return roll_result
 
+    # Individual dice, big pools are only expanded when asked for
+    @property
+    def rolls(self) -> list:
+        if self._rolls is None:
+            self._rolls = [roll for rolls in self.term_rolls for roll in rolls]
+        return self._rolls
+
+    @rolls.setter
+    def rolls(self, rolls: list) -> None:
+        self._rolls = rolls
+
+    # Keep a second roll of the same expression
+    def _keep_reroll(self, value, term_rolls, crit) -> None:
+        self.value = value
+        self.term_rolls = self.compiled.pack(term_rolls)
+        self._rolls = None
+        self._data = None
+        self._term_crits = None
+        self.crit = crit
+
     # Reroll with advantage
     def advantage(self):
-        roll = RollDice(self.dice.replace('a',''), self.crit_val)
-        if roll.value >= self.value:
-            self.value = roll.value
-            self.rolls = roll.rolls
-            self.crit = roll.crit
+        roll = self.compiled.roll_terms(self.crit_val, self.rng)
+        if roll[0] >= self.value:
+            self._keep_reroll(*roll)
 
     # Reroll with disadvantage
     def disadvantage(self):
-        roll = RollDice(self.dice.replace('d','', 1) if self.dice.startswith('d') else self.dice, self.crit_val)
-        if roll.value <= self.value:
-            self.value = roll.value
-            self.rolls = roll.rolls
-            self.crit = roll.crit
+        roll = self.compiled.roll_terms(self.crit_val, self.rng)
+        if roll[0] <= self.value:
+            self._keep_reroll(*roll)
 
     def __str__(self):
         return str(self.data)
 
 
-def roll(dice: str = "1d6") -> int:
+def roll(dice: str = "1d6", rng=None) -> int:
     """Rolls dice and returns only an int
 
     Args:
         dice (str): Required: '(int)d(int)' Optional parameters:[k(int),('+', '*', '/', '//', '-', '**')(int||roll)]
+        rng: Optional random number generator or seed, see as_rng
 
     Returns:
         Int
     """
-    return RollDice(dice).value
+    return RollDice(dice, rng=rng).value
 
 
 def advantage(func, *args, **kwargs) -> int:
@@ -201,40 +169,12 @@ def disadvantage(func, *args, **kwargs) -> int:
     return min(func(*args, **kwargs), func(*args, **kwargs))
 
 
-# Thank you https://gist.github.com/nitori for the expression validation
-class ValidateExpression(ast.NodeVisitor):
-    allowed = (
-        ast.Add,
-        ast.Sub,
-        ast.Mult,
-        ast.FloorDiv,
-        ast.Div,
-        ast.Pow,
-        ast.BinOp,
-        ast.Expression,
-        ast.Constant
-    )
-
-    def visit(self, node):
-        if not isinstance(node, tuple(self.allowed)):
-            raise SyntaxError(f"Invalid node: {node}")
-
-        if isinstance(node, ast.Call):
-            if not isinstance(node.func, ast.Name):
-                # might not be ast.Name, e.g.: foo(bar)(spam)
-                raise SyntaxError(f"Invalid function: {node.func}")
-
-        if isinstance(node, ast.Constant):
-            if not isinstance(node.value, int) and not isinstance(node.value, float):
-                raise SyntaxError(
-                    f'Non Int or Float {type(node.value)}({node.value})')
-
-        return super().visit(node)
-
-
-def validate_expression(expr_str: str) -> None:
-    expr_ast = ast.parse(expr_str, mode="eval")
-    ValidateExpression().visit(expr_ast)
+# The validator needs ast, it is only imported when asked for
+def __getattr__(name: str):
+    if name in ("ValidateExpression", "validate_expression"):
+        from . import validate
+        return getattr(validate, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+from .parser import BinOp, Constant, DiceTerm
+from .rng import BULK_MIN_DICE
+
+# Results of these operators on two ints are ints, "/" and "**" can give floats
+INTEGRAL_OPERATORS = {"+", "-", "*", "//"}
+
+# Constant powers are only folded up to this many bits, bigger ones are left to roll time
+MAX_FOLDED_BITS = 4096
+
+
+# True when every value in the tree is an int, so sums can be regrouped exactly
+def integral(node) -> bool:
+    if isinstance(node, BinOp):
+        return node.op in INTEGRAL_OPERATORS and integral(node.left) and integral(node.right)
+    return True
+
+
+# Value of op on two constants, None when it should be left to roll time
+def fold_constants(op: BinOp, left: int, right: int):
+    if op.op == "/":
+        return None
+    if op.op == "**" and (right < 0 or abs(left) > 1 and right * abs(left).bit_length() > MAX_FOLDED_BITS):
+        return None
+    try:
+        return op.func(left, right)
+    except ZeroDivisionError:
+        return None
+
+
+def fold(node, protected=None):
+    """Folds constant sub expressions, drops *1, +0 and **1 and merges neighbouring small plain dice
+
+    Dice terms stay in the order they are written so the rolls come out the
+    same, only their grouping changes. protected is never merged with another term.
+
+    Args:
+        node: Root of a parsed expression
+        protected: Optional DiceTerm that has to stay a term of its own
+
+    Returns:
+        Root of an expression with the same results
+    """
+    if not isinstance(node, BinOp):
+        return node
+    if node.op in ("+", "-") and integral(node):
+        return fold_sum(node, protected)
+
+    left, right = fold(node.left, protected), fold(node.right, protected)
+    left_constant, right_constant = isinstance(left, Constant), isinstance(right, Constant)
+    if left_constant and right_constant:
+        value = fold_constants(node, left.value, right.value)
+        if value is not None:
+            return Constant(value)
+
+    # Identities, the other side is returned unchanged
+    if right_constant and (right.value == 1 and node.op in ("*", "**") or right.value == 0 and node.op in ("+", "-")):
+        return left
+    if left_constant and (left.value == 1 and node.op == "*" or left.value == 0 and node.op == "+"):
+        return right
+    return BinOp(node.op, left, right)
+
+
+# Operands of a chain of "+" and "-" with the sign each one is added with, each passed through simplify
+def signed_operands(node, sign: int, simplify, out: list) -> list:
+    if isinstance(node, BinOp) and node.op in ("+", "-"):
+        signed_operands(node.left, sign, simplify, out)
+        signed_operands(node.right, sign if node.op == "+" else -sign, simplify, out)
+    else:
+        out.append((sign, simplify(node)))
+    return out
+
+
+# Dice summed as they are rolled, nothing kept, rerolled or rolled twice
+def plain_dice(node) -> bool:
+    return isinstance(node, DiceTerm) and node.keep == node.count and not node.mode and not node.modified
+
+
+# Two neighbouring terms only roll the same as one pool while every die is drawn on its own, bulk draws
+# and histogram pools take other random numbers for a bigger count
+def mergeable(last, operand, protected) -> bool:
+    return (plain_dice(last) and plain_dice(operand) and protected is not last and protected is not operand
+            and last.sides == operand.sides and last.count + operand.count < BULK_MIN_DICE)
+
+
+# Integer sum with every constant added up into one and neighbouring small dice of one size rolled as one pool
+def fold_sum(node, protected):
+    constant = 0
+    operands: list = []
+    for sign, operand in signed_operands(node, 1, lambda operand: fold(operand, protected), []):
+        if isinstance(operand, Constant):
+            constant += sign * operand.value
+            continue
+        if operands:
+            last_sign, last = operands[-1]
+            if last_sign == sign and mergeable(last, operand, protected):
+                count = last.count + operand.count
+                merged = DiceTerm(count, last.sides, count, False)
+                merged.parts = last.parts + operand.parts
+                operands[-1] = (sign, merged)
+                continue
+        operands.append((sign, operand))
+
+    if not operands:
+        return Constant(constant)
+
+    # Constants go last unless the chain would start by subtracting
+    if operands[0][0] < 0:
+        tree = Constant(constant)
+    else:
+        tree = operands.pop(0)[1]
+        if constant:
+            operands.append((1 if constant > 0 else -1, Constant(abs(constant))))
+    for sign, operand in operands:
+        tree = BinOp("+" if sign > 0 else "-", tree, operand)
+    return tree
@@ -0,0 +1,99 @@
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from .rng import RNGBackend
+
+__all__ = ["Recorder", "instrument"]
+
+# Active Recorder of the current context, so threads and tasks started elsewhere are not
+# recorded. The hooks in the rolling code only check its value for None when disabled
+recorder: ContextVar = ContextVar("multi_dice_recorder", default=None)
+
+
+# Collects per phase timings and counters while it is the active recorder
+class Recorder:
+    def __init__(self) -> None:
+        self.phases: dict = {}
+        self.counters: Counter = Counter()
+        self.previous = None
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        stats = self.phases.get(phase)
+        if stats is None:
+            self.phases[phase] = [1, seconds, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] += amount
+
+    def to_dict(self) -> dict:
+        return {
+            "phases": {
+                phase: {"count": count, "seconds": total, "max_seconds": longest}
+                for phase, (count, total, longest) in self.phases.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+    def to_prometheus(self, prefix: str = "multi_dice") -> str:
+        """Everything recorded in the Prometheus text exposition format"""
+        lines: list = [
+            f"# HELP {prefix}_phase_seconds Time spent in each phase of rolling",
+            f"# TYPE {prefix}_phase_seconds summary",
+        ]
+        for phase, (count, total, _) in sorted(self.phases.items()):
+            lines.append(f'{prefix}_phase_seconds_sum{{phase="{phase}"}} {total!r}')
+            lines.append(f'{prefix}_phase_seconds_count{{phase="{phase}"}} {count}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def __enter__(self) -> "Recorder":
+        self.previous = recorder.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        recorder.reset(self.previous)
+        self.previous = None
+
+
+# Wraps a backend while recording, timing draws and counting the dice
+class TimedRNG(RNGBackend):
+    def __init__(self, rng, active: Recorder) -> None:
+        self.rng = rng
+        self.recorder: Recorder = active
+        self.randint = rng.randint
+        self.getrandbits = rng.getrandbits
+
+    def faces(self, count: int, sides: int) -> list:
+        start = time.perf_counter()
+        faces = self.rng.faces(count, sides)
+        self.recorder.add_time("rng", time.perf_counter() - start)
+        self.recorder.count("dice_drawn", count)
+        return faces
+
+    def counts(self, count: int, sides: int) -> list:
+        start = time.perf_counter()
+        counts = self.rng.counts(count, sides)
+        self.recorder.add_time("rng", time.perf_counter() - start)
+        self.recorder.count("dice_drawn", count)
+        return counts
+
+
+def instrument() -> Recorder:
+    """Records timings and counters for everything rolled inside a with block
+
+    Returns:
+        (Recorder): Context manager with to_dict() and to_prometheus() exporters
+
+    Example:
+        with multi_dice.instrument() as stats:
+            multi_dice.roll("4d6k3")
+        print(stats.to_prometheus())
+    """
+    return Recorder()
@@ -0,0 +1,89 @@
+import heapq
+import math
+
+__all__ = ["choose_keeper", "keep_from_counts"]
+
+# Pools of many sided dice this big only sort the dice close to the expected cut, sorting them all is faster below
+WINDOW_MIN_DICE = 10_000
+
+# Standard deviations of the cut face around its expected value the window covers
+WINDOW_SPREAD = 6
+
+
+# Total of the kept dice given how many times each face came up (index = face)
+def keep_from_counts(counts, keep: int, highest: bool) -> int:
+    faces = range(len(counts) - 1, 0, -1) if highest else range(1, len(counts))
+    total = 0
+    for face in faces:
+        showing = counts[face]
+        if showing >= keep:
+            return total + keep * face
+        total += showing * face
+        keep -= showing
+    return total
+
+
+# Keeps every die past a window around the face the k-th kept die is expected on and sorts only the window
+def window_keeper(count: int, sides: int, keep: int, highest: bool):
+    share = keep / count
+    cut = sides * (1 - share) if highest else sides * share
+    margin = WINDOW_SPREAD * sides * math.sqrt(share * (1 - share) / count) + 1
+    low, high = cut - margin, cut + margin
+
+    def keep_window(rolls):
+        kept = [roll for roll in rolls if roll > high] if highest else [roll for roll in rolls if roll < low]
+        near = [roll for roll in rolls if low <= roll <= high]
+        missing = keep - len(kept)
+        if not 0 <= missing <= len(near):
+            # The cut landed outside the window, rare enough for a full sort
+            return sum(sorted(rolls, reverse=highest)[:keep])
+        near.sort(reverse=highest)
+        return sum(kept) + sum(near[:missing])
+    return keep_window
+
+
+def choose_keeper(count: int, sides: int, keep: int, highest: bool, uniform: bool = True):
+    """Picks the fastest way to total the kept dice for a pool
+
+    Args:
+        count (int): Number of dice rolled
+        sides (int): Sides on each die
+        keep (int): Number of dice kept
+        highest (bool): Keep the highest dice, otherwise the lowest
+        uniform (bool): Every face from 1 to sides is equally likely, False after rerolls
+
+    Returns:
+        Function taking the list of rolls and returning the kept total
+    """
+    drop = count - keep
+
+    if drop == 0:
+        return sum
+
+    best, worst = (max, min) if highest else (min, max)
+    if keep == 1:
+        return best
+    if drop == 1:
+        return lambda rolls: sum(rolls) - worst(rolls)
+
+    # Only a handful of dice kept or dropped out of a big pool, select instead of sorting
+    if min(keep, drop) * 64 <= count:
+        if keep <= drop:
+            select = heapq.nlargest if highest else heapq.nsmallest
+            return lambda rolls: sum(select(keep, rolls))
+        select = heapq.nsmallest if highest else heapq.nlargest
+        return lambda rolls: sum(rolls) - sum(select(drop, rolls))
+
+    # Many dice with few faces, counting sort by face value
+    if sides * 4 <= count:
+        def keep_counted(rolls):
+            counts = [0] * (sides + 1)
+            for roll in rolls:
+                counts[roll] += 1
+            return keep_from_counts(counts, keep, highest)
+        return keep_counted
+
+    if uniform and count >= WINDOW_MIN_DICE:
+        return window_keeper(count, sides, keep, highest)
+
+    return lambda rolls: sum(sorted(rolls, reverse=highest)[:keep])
@@ -0,0 +1,177 @@
+import math
+import os
+import random
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+from .compiled import compile_dice
+from .crit import CritCounts, term_crits
+from .rng import StdlibRNG
+from .vectorized import crit_counts_many, np, roll_compiled_extremes, rolls_per_chunk
+
+__all__ = ["SimulationResult", "simulate"]
+
+DEFAULT_CHUNK = 100_000
+
+
+# Histogram, crit count and crits of each dice term for one shard of trials, run inside a worker process
+def simulate_chunk(dice: str, trials: int, seed, crit_val: int) -> tuple:
+    compiled = compile_dice(dice)
+    if np is not None:
+        values, extremes = roll_compiled_extremes(compiled, np.random.default_rng(seed), trials)
+        results, counts = np.unique(values, return_counts=True)
+        term_counts = crit_counts_many(compiled, extremes, crit_val)
+        crits = term_counts[-1].crits if term_counts else 0
+        return dict(zip(results.tolist(), counts.tolist())), crits, term_counts
+
+    rng = StdlibRNG(random.Random(seed))
+    histogram: Counter = Counter()
+    crits: int = 0
+    term_counts = [CritCounts(repr(term), 0, 0, 0, 0) for term in compiled.crit_terms]
+    for _ in range(trials):
+        value, term_rolls, crit = compiled.roll_expression(crit_val, rng)
+        histogram[value] += 1
+        crits += crit
+        term_counts = [total + CritCounts.of(term_crit)
+                       for total, term_crit in zip(term_counts, term_crits(compiled, term_rolls, crit_val))]
+    return dict(histogram), crits, term_counts
+
+
+# Independent seed for every shard, so results only depend on seed and chunk size
+def shard_seeds(seed, shards: int) -> list:
+    if np is not None:
+        return np.random.SeedSequence(seed).spawn(shards)
+    root = random.Random(seed)
+    return [root.getrandbits(128) for _ in range(shards)]
+
+
+class SimulationResult:
+    def __init__(self, dice: str, histogram: Counter, trials: int, crits: int, stopped_early: bool,
+                 term_crits: list = None) -> None:
+        self.dice: str = dice
+        self.histogram: Counter = histogram
+        self.trials: int = trials
+        self.crits: int = crits
+        self.stopped_early: bool = stopped_early
+        # CritCounts of every dice term, in the order they are rolled
+        self.term_crits: list = term_crits or []
+
+    @property
+    def mean(self) -> float:
+        return sum(value * count for value, count in self.histogram.items()) / self.trials
+
+    @property
+    def variance(self) -> float:
+        mean = self.mean
+        return sum((value - mean) ** 2 * count for value, count in self.histogram.items()) / self.trials
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def crit_rate(self) -> float:
+        return self.crits / self.trials
+
+    def percentile(self, q: float):
+        """Smallest simulated result with at least q percent of trials at or below it"""
+        needed = q / 100 * self.trials
+        seen = 0
+        for value in sorted(self.histogram):
+            seen += self.histogram[value]
+            if seen >= needed:
+                return value
+        return max(self.histogram)
+
+    def confidence_interval(self, confidence: float = 0.95) -> tuple:
+        """Normal approximation interval for the mean"""
+        half = NormalDist().inv_cdf((1 + confidence) / 2) * self.stdev / math.sqrt(self.trials)
+        return self.mean - half, self.mean + half
+
+    def summary(self) -> dict:
+        return {
+            "die": self.dice,
+            "trials": self.trials,
+            "mean": self.mean,
+            "stdev": self.stdev,
+            "crit_rate": self.crit_rate,
+            "term_crit_rates": [
+                {"dice": term.dice, "crit": term.crit_rate, "natural_max": term.natural_max_rate,
+                 "natural_one": term.natural_one_rate}
+                for term in self.term_crits
+            ],
+            "percentiles": {q: self.percentile(q) for q in (5, 25, 50, 75, 95)},
+            "stopped_early": self.stopped_early,
+        }
+
+    def __repr__(self) -> str:
+        return f"SimulationResult({self.dice!r}, trials={self.trials}, mean={self.mean:.4f})"
+
+
+def simulate(dice: str, trials: int, workers: int = None, seed=None, crit: int = 20,
+             chunk: int = DEFAULT_CHUNK, ci_width: float = None, confidence: float = 0.95) -> SimulationResult:
+    """Monte Carlo simulation of a dice string sharded across processes
+
+    Args:
+        dice (str): The dice rolling string
+        trials (int): Number of rolls to simulate
+        workers (int): Worker processes, None for one per CPU, 1 to stay in process
+        seed: Optional seed, results only depend on seed and chunk, not on workers
+        crit (int): Value that causes critical hit
+        chunk (int): Trials per shard, fewer when that many rolls would draw more than DRAW_BUDGET values
+        ci_width (float): Stop early once the confidence interval of the mean is this narrow
+        confidence (float): Confidence level used with ci_width
+
+    Returns:
+        (SimulationResult): Histogram with mean, stdev, percentiles, crit rate and crit rates of every dice term
+    """
+    if trials < 1 or chunk < 1:
+        raise ValueError(f"Trials and chunk must be at least 1: {trials}, {chunk}")
+    compiled = compile_dice(dice)
+    dice = compiled.dice
+    # Every shard is drawn as one array, big pools get smaller shards
+    chunk = min(chunk, rolls_per_chunk(compiled))
+    sizes = [min(chunk, trials - start) for start in range(0, trials, chunk)]
+    seeds = shard_seeds(seed, len(sizes))
+    workers = workers or os.cpu_count() or 1
+
+    result = SimulationResult(dice, Counter(), 0, 0, False)
+
+    # Merge one shard and check whether the interval is already narrow enough
+    def merge(shard: tuple) -> bool:
+        histogram, crits, term_counts = shard
+        result.histogram.update(histogram)
+        result.trials += sum(histogram.values())
+        result.crits += crits
+        result.term_crits = [total + counts for total, counts in zip(result.term_crits, term_counts)] or term_counts
+        if ci_width is None or result.trials >= trials:
+            return False
+        low, high = result.confidence_interval(confidence)
+        return high - low <= ci_width
+
+    if workers == 1 or len(sizes) == 1:
+        for size, shard_seed in zip(sizes, seeds):
+            if merge(simulate_chunk(dice, size, shard_seed, crit)):
+                result.stopped_early = True
+                break
+        return result
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        shards = iter(zip(sizes, seeds))
+        while True:
+            # Keep every worker busy with one shard queued behind it
+            for size, shard_seed in shards:
+                pending.append(pool.submit(simulate_chunk, dice, size, shard_seed, crit))
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                break
+            # Shards are merged in order so early stopping is reproducible
+            if merge(pending.popleft().result()):
+                result.stopped_early = True
+                for future in pending:
+                    future.cancel()
+                break
+    return result
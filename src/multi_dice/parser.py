@@ -0,0 +1,307 @@
+import operator
+import re
+
+from .keep import choose_keeper
+from .pool import FacePool, use_histogram
+from .rng import DEFAULT_RNG
+
+__all__ = ["Constant", "DiceTerm", "BinOp", "parse_expression", "parse_term"]
+
+MAX_DICE = 100_000
+MAX_SIDES = 100_000
+
+OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "//": operator.floordiv,
+    "**": operator.pow,
+}
+
+# Binding power of each operator, "**" is right associative like in Python
+PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2, "//": 2, "**": 3}
+
+TOKEN_RE = re.compile(r"(\*\*|//|[-+*/()])|([^-+*/()]+)")
+
+# Dice term: optional per roll advantage, NdS, then any keep/drop, reroll, explode and success modifiers
+TERM_RE = re.compile(r"([AD]?)(\d+)d(\d+)((?:k\d+|l\d+|dh\d+|dl\d+|ro\d+|r\d+|!|>=\d+|<=\d+|>\d+|<\d+)*)")
+MODIFIER_RE = re.compile(r"(k|l|dh|dl|ro|r|!|>=|<=|>|<)(\d*)")
+
+# Success counting comparisons, "10d10>=7" counts the dice showing 7 or more
+COMPARISONS = {">=": operator.ge, "<=": operator.le, ">": operator.gt, "<": operator.lt}
+
+# The same comparisons as methods of the target, target.__le__(face) is face >= target
+FLIPPED = {">=": "__le__", "<=": "__ge__", ">": "__lt__", "<": "__gt__"}
+
+# Rounds of explosions at most, dice still showing the highest face after the last round stay as they are
+MAX_EXPLOSIONS = 100
+
+
+# Plain integer inside an expression
+class Constant:
+    __slots__ = ("value",)
+
+    def __init__(self, value: int) -> None:
+        self.value: int = value
+
+    def roll(self, out: list, rng=DEFAULT_RNG):
+        return self.value
+
+    def substitute(self, func):
+        return self.value
+
+    def terms(self):
+        yield self
+
+    def __repr__(self) -> str:
+        return str(self.value)
+
+
+# Single "NdS" roll inside an expression, parsed once at compile time
+class DiceTerm:
+    __slots__ = ("count", "sides", "keep", "highest", "mode", "reroll", "reroll_once", "explode", "success", "target",
+                 "keeper", "histogram", "parts")
+
+    def __init__(self, count: int, sides: int, keep: int, highest: bool, mode: str = "", reroll: int = 0,
+                 reroll_once: bool = False, explode: bool = False, success: str = "", target: int = 0) -> None:
+        self.count: int = count
+        self.sides: int = sides
+        self.keep: int = keep
+        self.highest: bool = highest
+        self.mode: str = mode
+        self.reroll: int = reroll
+        self.reroll_once: bool = reroll_once
+        self.explode: bool = explode
+        self.success: str = success
+        self.target: int = target
+        self.keeper = choose_keeper(count, sides, keep, highest, not reroll)
+        # Explosions and single rerolls change which dice are in the pool after the draw
+        self.histogram: bool = use_histogram(count, sides) and not explode and not reroll_once
+        # Dice counts of the terms as written when neighbouring terms were merged into this one
+        self.parts: tuple = (count,)
+
+    # Everything that decides the results of the term, the key of its cached tables
+    @property
+    def key(self) -> tuple:
+        return (self.count, self.sides, self.keep, self.highest, self.mode, self.reroll, self.reroll_once,
+                self.explode, self.success, self.target)
+
+    @property
+    def modified(self) -> bool:
+        return bool(self.reroll or self.explode or self.success)
+
+    # Roll the term, appending the kept set of dice to out
+    def roll(self, out: list, rng=DEFAULT_RNG):
+        rolls, total = self._draw(rng)
+        if self.mode:
+            secondrolls, secondtotal = self._draw(rng)
+            if (self.mode == "A" and secondtotal > total) or (self.mode == "D" and secondtotal < total):
+                rolls, total = secondrolls, secondtotal
+        out.append(rolls)
+        return total
+
+    def _draw(self, rng) -> tuple:
+        if self.histogram:
+            counts = rng.counts(self.count, self.sides - self.reroll)
+            if self.reroll:
+                # Faces above the reroll threshold, shifted back into place
+                counts = [0] * self.reroll + counts
+            pool = FacePool(counts)
+            if self.success:
+                test = COMPARISONS[self.success]
+                successes = sum(showing for face, showing in enumerate(counts) if face and test(face, self.target))
+                return pool, kept_successes(successes, self.count, self.keep, self.highest, self.success)
+            return pool, pool.total(None if self.keep == self.count else self.keep, self.highest)
+
+        rolls = self.faces(self.count, rng)
+        if self.explode:
+            # Every die showing the highest face adds another die, drawn together each round
+            exploding = rolls.count(self.sides)
+            for _ in range(MAX_EXPLOSIONS):
+                if not exploding:
+                    break
+                extra = self.faces(exploding, rng)
+                rolls.extend(extra)
+                exploding = extra.count(self.sides)
+        if self.success:
+            successes = sum(map(getattr(self.target, FLIPPED[self.success]), rolls))
+            return rolls, kept_successes(successes, self.count, self.keep, self.highest, self.success)
+        return rolls, self.keeper(rolls)
+
+    # Faces of count dice after rerolls
+    def faces(self, count: int, rng) -> list:
+        if self.reroll and not self.reroll_once:
+            # Rerolling until above the threshold is rolling a smaller die above it
+            return [face + self.reroll for face in rng.faces(count, self.sides - self.reroll)]
+        faces = rng.faces(count, self.sides)
+        if self.reroll:
+            low = [index for index, face in enumerate(faces) if face <= self.reroll]
+            for index, face in zip(low, rng.faces(len(low), self.sides)):
+                faces[index] = face
+        return faces
+
+    def substitute(self, func):
+        return func(self)
+
+    def terms(self):
+        yield self
+
+    def __repr__(self) -> str:
+        reroll = f"{'ro' if self.reroll_once else 'r'}{self.reroll}" if self.reroll else ""
+        keep = ""
+        if self.keep != self.count:
+            keep = f"{'k' if self.highest else 'l'}{self.keep}"
+        success = f"{self.success}{self.target}" if self.success else ""
+        return f"{self.mode}{self.count}d{self.sides}{reroll}{'!' if self.explode else ''}{keep}{success}"
+
+
+# Successes among the kept dice, the kept dice are the ones most or least likely to succeed
+def kept_successes(successes: int, count: int, keep: int, highest: bool, success: str) -> int:
+    if keep == count:
+        return successes
+    if (success in (">=", ">")) == highest:
+        return min(keep, successes)
+    return max(0, successes - (count - keep))
+
+
+# Arithmetic between two sub expressions
+class BinOp:
+    __slots__ = ("op", "func", "left", "right")
+
+    def __init__(self, op: str, left, right) -> None:
+        self.op: str = op
+        self.func = OPERATORS[op]
+        self.left = left
+        self.right = right
+
+    def roll(self, out: list, rng=DEFAULT_RNG):
+        return self.func(self.left.roll(out, rng), self.right.roll(out, rng))
+
+    # Evaluate with every dice term replaced by func(term)
+    def substitute(self, func):
+        return self.func(self.left.substitute(func), self.right.substitute(func))
+
+    # Every Constant and DiceTerm from left to right
+    def terms(self):
+        yield from self.left.terms()
+        yield from self.right.terms()
+
+    def __repr__(self) -> str:
+        return f"({self.left!r}{self.op}{self.right!r})"
+
+
+# Parse a single roll such as "A4d6k3", "6d6!", "4d6r1", "10d10>=7" or a plain integer constant
+def parse_term(die: str):
+    if "d" not in die:
+        return Constant(int(die))
+
+    match = TERM_RE.fullmatch(die)
+    if match is None:
+        raise ValueError(f"Invalid dice term: {die!r}")
+    mode, number_of_dice, die_sides, modifiers = match.groups()
+    number_of_dice = int(number_of_dice)
+    die_sides = int(die_sides)
+
+    # Check for keeping/dropping, rerolls, explosions and success counting
+    k_value = number_of_dice
+    highest = False
+    reroll = 0
+    reroll_once = False
+    explode = False
+    success = ""
+    target = 0
+    for name, value in MODIFIER_RE.findall(modifiers):
+        if name in ("k", "l"):
+            k_value, highest = int(value), name == "k"
+        elif name in ("dh", "dl"):
+            k_value, highest = number_of_dice - int(value), name == "dl"
+        elif name in ("r", "ro"):
+            reroll, reroll_once = int(value), name == "ro"
+        elif name == "!":
+            explode = True
+        else:
+            success, target = name, int(value)
+
+    # Validate inputs
+    if number_of_dice > MAX_DICE or die_sides > MAX_SIDES or not 0 <= k_value <= number_of_dice:
+        raise ValueError(f"Dice outside the limits: {die!r}")
+    # No dice roll 0 whatever their sides, like the original parser did for "0d0"
+    if die_sides < 1 and number_of_dice:
+        raise ValueError(f"Dice need at least one side: {die!r}")
+    if reroll and reroll >= die_sides or explode and die_sides < 2:
+        raise ValueError(f"Every face would be rerolled or explode: {die!r}")
+    if explode and k_value != number_of_dice:
+        raise ValueError(f"Exploding dice cannot be kept or dropped: {die!r}")
+
+    return DiceTerm(number_of_dice, die_sides, k_value, highest, mode, reroll, reroll_once, explode, success, target)
+
+
+def tokenize(expression: str) -> list:
+    tokens: list = []
+    for match in TOKEN_RE.finditer(expression):
+        if match.group(1):
+            tokens.append(("op", match.group(1)))
+        else:
+            tokens.append(("term", parse_term(match.group(2))))
+    return tokens
+
+
+# Precedence climbing parser over the token list
+class Parser:
+    def __init__(self, expression: str) -> None:
+        self.expression: str = expression
+        self.tokens: list = tokenize(expression)
+        self.index: int = 0
+
+    def peek(self):
+        if self.index < len(self.tokens):
+            return self.tokens[self.index]
+        return (None, None)
+
+    def error(self, message: str) -> SyntaxError:
+        return SyntaxError(f"{message} in dice expression {self.expression!r}")
+
+    def parse(self):
+        node = self.parse_binary(1)
+        if self.index != len(self.tokens):
+            raise self.error(f"Unexpected {self.peek()[1]!r}")
+        return node
+
+    def parse_binary(self, min_precedence: int):
+        left = self.parse_operand()
+        while True:
+            kind, op = self.peek()
+            if kind != "op" or op not in PRECEDENCE or PRECEDENCE[op] < min_precedence:
+                return left
+            self.index += 1
+            # Right associative operators bind their own level again on the right
+            next_precedence = PRECEDENCE[op] if op == "**" else PRECEDENCE[op] + 1
+            left = BinOp(op, left, self.parse_binary(next_precedence))
+
+    def parse_operand(self):
+        kind, value = self.peek()
+        self.index += 1
+        if kind == "term":
+            return value
+        if value == "(":
+            node = self.parse_binary(1)
+            if self.peek()[1] != ")":
+                raise self.error("Missing ')'")
+            self.index += 1
+            return node
+        if kind is None:
+            raise self.error("Unexpected end")
+        raise self.error(f"Unexpected {value!r}")
+
+
+def parse_expression(expression: str):
+    """Parses a dice expression without any advantage prefix into a tree
+
+    Args:
+        expression (str): Dice string such as '(2d8+A1d6)*2'
+
+    Returns:
+        Root node made of Constant, DiceTerm and BinOp
+    """
+    return Parser(expression).parse()
@@ -0,0 +1,665 @@
+import functools
+import itertools
+import math
+from collections import namedtuple
+
+from .parser import COMPARISONS, MAX_EXPLOSIONS, BinOp, Constant, DiceTerm, kept_successes
+
+# Mean, variance and range of a roll
+Moments = namedtuple("Moments", ["mean", "variance", "minimum", "maximum"])
+
+# Rough number of steps a probability table may take to build, bigger rolls use large pool approximations
+EXACT_WORK = 500_000
+
+# Steps keep_highest_distribution, keep_highest_moments and keep_highest_split_moments may take before
+# giving up, about half a second each, bigger keeps use the cut approximation
+KEEP_MOMENTS_STEPS = 500_000
+
+# Standard deviations of a binomial past which keep tables leave out the dice counts
+SPREAD = 9
+
+# States of keep tables less likely than this are dropped
+NEGLIGIBLE = 1e-18
+
+# Chains of explosions less likely than this are left out of the exact tables
+EXPLOSION_CUTOFF = 1e-16
+
+# Operators whose mean and variance combine exactly for independent sub expressions
+LINEAR_OPERATORS = {"+", "-", "*"}
+
+
+# Number of ways each total of n s-sided dice can come up, index 0 is the total n
+def sum_counts(number_of_dice: int, die_sides: int) -> list:
+    counts: list = [1]
+    for _ in range(number_of_dice):
+        prefix = [0, *itertools.accumulate(counts)]
+        length = len(counts)
+        counts = [
+            prefix[min(j + 1, length)] - prefix[max(j - die_sides + 1, 0)]
+            for j in range(length + die_sides - 1)
+        ]
+    return counts
+
+
+# Number of ways each kept total comes up when keeping the k highest dice
+def keep_highest_counts(number_of_dice: int, die_sides: int, k_value: int) -> dict:
+    finished: dict = {}
+    # (dice assigned so far, kept total) -> ways, assigning faces from the top down
+    states: dict = {(0, 0): 1}
+    for face in range(die_sides, 0, -1):
+        next_states: dict = {}
+        for (assigned, total), ways in states.items():
+            remaining = number_of_dice - assigned
+            # Every die left over has to show a 1 on the last face
+            first = remaining if face == 1 else 0
+            for showing in range(first, remaining + 1):
+                new_assigned = assigned + showing
+                new_total = total + min(showing, k_value - assigned) * face
+                new_ways = ways * math.comb(remaining, showing)
+                if new_assigned >= k_value:
+                    # The rest of the dice are below this face and are not kept
+                    new_ways *= (face - 1) ** (number_of_dice - new_assigned)
+                    finished[new_total] = finished.get(new_total, 0) + new_ways
+                else:
+                    key = (new_assigned, new_total)
+                    next_states[key] = next_states.get(key, 0) + new_ways
+        states = next_states
+    return finished
+
+
+# Distribution of the best/worst of independent rolls, two for advantage/disadvantage
+def best_of(pmf: dict, highest: bool, times: int = 2) -> dict:
+    result: dict = {}
+    below = 0.0
+    for value in sorted(pmf):
+        probability = pmf[value]
+        if highest:
+            result[value] = (below + probability) ** times - below ** times
+        else:
+            result[value] = (1 - below) ** times - (1 - below - probability) ** times
+        below += probability
+    return result
+
+
+# Distribution of one die after its rerolls
+@functools.lru_cache(maxsize=None)
+def die_distribution(sides: int, reroll: int = 0, reroll_once: bool = False) -> dict:
+    if not reroll_once:
+        return {face: 1 / (sides - reroll) for face in range(reroll + 1, sides + 1)}
+    # Low faces are rerolled once and keep whatever comes up the second time
+    return {face: (face > reroll) / sides + reroll / sides / sides for face in range(1, sides + 1)}
+
+
+# Distribution of what one die adds to the term, its face or whether it is a success,
+# including every die its explosions add
+@functools.lru_cache(maxsize=None)
+def chain_distribution(sides: int, reroll: int = 0, reroll_once: bool = False, explode: bool = False,
+                       success: str = "", target: int = 0) -> dict:
+    die = die_distribution(sides, reroll, reroll_once)
+    if success:
+        test = COMPARISONS[success]
+        value = {face: int(test(face, target)) for face in die}
+    else:
+        value = {face: face for face in die}
+
+    result: dict = {}
+    chance = 1.0
+    for rounds in range(MAX_EXPLOSIONS + 1 if explode else 1):
+        # Every round so far showed the highest face, the last die stays even then
+        last = not explode or rounds == MAX_EXPLOSIONS
+        for face, probability in die.items():
+            if face != sides or last:
+                total = rounds * value[sides] + value[face]
+                result[total] = result.get(total, 0.0) + chance * probability
+        chance *= die[sides]
+        if chance < EXPLOSION_CUTOFF:
+            break
+    return dict(sorted(result.items()))
+
+
+def convolve(left: dict, right: dict) -> dict:
+    result: dict = {}
+    for a, pa in left.items():
+        for b, pb in right.items():
+            result[a + b] = result.get(a + b, 0.0) + pa * pb
+    return result
+
+
+# Distribution of the sum of n independent rolls, by repeated squaring
+def convolve_power(pmf: dict, n: int) -> dict:
+    result: dict = {0: 1.0}
+    while n:
+        if n & 1:
+            result = convolve(result, pmf)
+        n >>= 1
+        if n:
+            pmf = convolve(pmf, pmf)
+    return dict(sorted(result.items()))
+
+
+# Distribution of the kept successes among count dice, each a success with the same chance
+def success_distribution(count: int, chance: float, keep: int, highest: bool, success: str) -> dict:
+    result: dict = {}
+    for successes in range(count + 1):
+        if chance in (0.0, 1.0):
+            probability = float(successes == count * chance)
+        else:
+            probability = math.exp(math.lgamma(count + 1) - math.lgamma(successes + 1)
+                                   - math.lgamma(count - successes + 1) + successes * math.log(chance)
+                                   + (count - successes) * math.log1p(-chance))
+        kept = kept_successes(successes, count, keep, highest, success)
+        result[kept] = result.get(kept, 0.0) + probability
+    return dict(sorted(result.items()))
+
+
+# Distribution of the k highest of n dice rolled from any die distribution, faces from the top down.
+# With max_steps, dice counts past SPREAD standard deviations and states less likely than NEGLIGIBLE
+# are left out and None is returned once more than max_steps steps would be needed
+def keep_highest_distribution(count: int, die: dict, keep: int, max_steps: int = None):
+    log_factorials = [math.lgamma(i + 1) for i in range(count + 1)]
+    finished: dict = {}
+    # (dice assigned so far, kept total) -> probability
+    states: dict = {(0, 0): 1.0}
+    below = 1.0
+    steps = 0
+    for face in sorted(die, reverse=True):
+        # Chance of this face for a die known to show it or less
+        chance = min(die[face] / below, 1.0) if below > 0 else 1.0
+        below -= die[face]
+        if chance <= 0:
+            continue
+        log_chance, log_miss = math.log(chance), math.log1p(-chance) if chance < 1 else -math.inf
+        next_states: dict = {}
+        for (assigned, total), probability in states.items():
+            if max_steps is not None and probability < NEGLIGIBLE:
+                continue
+            remaining = count - assigned
+            needed = keep - assigned
+            if max_steps is None:
+                showings = range(needed if chance < 1 else 0)
+            else:
+                showings = binomial_window(remaining, chance, needed)
+                steps += len(showings)
+                if steps > max_steps:
+                    return None
+            # Whatever is left of the binomial reaches keep on this face
+            rest = 1.0
+            for showing in showings:
+                ways = binomial(log_factorials, remaining, showing, log_chance, log_miss)
+                rest -= ways
+                key = (assigned + showing, total + showing * face)
+                next_states[key] = next_states.get(key, 0.0) + probability * ways
+            if max_steps is None and chance < 1:
+                # Summed rather than subtracted from 1, so totals as unlikely as every die rolling a 1 survive
+                rest = sum(binomial(log_factorials, remaining, showing, log_chance, log_miss)
+                           for showing in range(needed, remaining + 1))
+            if rest > 0:
+                total += needed * face
+                finished[total] = finished.get(total, 0.0) + probability * rest
+        states = next_states
+    return dict(sorted(finished.items()))
+
+
+# Keep highest/lowest of n dice from any die distribution, see keep_highest_distribution
+def keep_distribution(count: int, die: dict, keep: int, highest: bool, max_steps: int = None):
+    if highest:
+        return keep_highest_distribution(count, die, keep, max_steps)
+    # Lowest k are the highest k of the negated faces
+    pmf = keep_highest_distribution(count, {-face: chance for face, chance in die.items()}, keep, max_steps)
+    if pmf is None:
+        return None
+    return {-total: probability for total, probability in reversed(pmf.items())}
+
+
+# Dice counts below needed worth visiting for a binomial of remaining dice
+def binomial_window(remaining: int, chance: float, needed: int) -> range:
+    if chance >= 1:
+        return range(0)
+    spread = SPREAD * math.sqrt(remaining * chance * (1 - chance)) + 1
+    return range(max(0, int(remaining * chance - spread)), min(needed, int(remaining * chance + spread) + 1))
+
+
+def binomial(log_factorials: list, trials: int, successes: int, log_chance: float, log_miss: float) -> float:
+    return math.exp(log_factorials[trials] - log_factorials[successes] - log_factorials[trials - successes]
+                    + successes * log_chance + (trials - successes) * log_miss)
+
+
+@functools.lru_cache(maxsize=None)
+def term_distribution(count: int, sides: int, keep: int, highest: bool, mode: str, reroll: int = 0,
+                      reroll_once: bool = False, explode: bool = False, success: str = "", target: int = 0) -> dict:
+    if success and not explode:
+        chance = chain_distribution(sides, reroll, reroll_once, False, success, target).get(1, 0.0)
+        pmf = success_distribution(count, chance, keep, highest, success)
+    elif explode or reroll_once and keep == count:
+        pmf = convolve_power(chain_distribution(sides, reroll, reroll_once, explode, success, target), count)
+    elif reroll_once:
+        pmf = keep_distribution(count, die_distribution(sides, reroll, reroll_once), keep, highest)
+    elif reroll:
+        # Rerolling every face up to the threshold is a smaller die moved up past it
+        pmf = {total + keep * reroll: probability for total, probability in
+               term_distribution(count, sides - reroll, keep, highest, "").items()}
+    elif keep == count:
+        pmf = {count + i: ways / sides ** count for i, ways in enumerate(sum_counts(count, sides)) if ways}
+    else:
+        counts = keep_highest_counts(count, sides, keep)
+        if not highest:
+            # Lowest k of X is k*(sides+1) minus the highest k of sides+1-X
+            counts = {keep * (sides + 1) - total: ways for total, ways in counts.items()}
+        pmf = {total: ways / sides ** count for total, ways in sorted(counts.items())}
+
+    if mode:
+        pmf = best_of(pmf, mode == "A")
+    return pmf
+
+
+# Exact distribution of a parsed tree, combining independent sub trees pairwise
+def tree_distribution(node) -> dict:
+    if isinstance(node, Constant):
+        return {node.value: 1.0}
+    if isinstance(node, DiceTerm):
+        return term_distribution(*node.key)
+
+    left = tree_distribution(node.left)
+    right = tree_distribution(node.right)
+    result: dict = {}
+    for a, pa in left.items():
+        for b, pb in right.items():
+            value = node.func(a, b)
+            result[value] = result.get(value, 0.0) + pa * pb
+    return result
+
+
+# Steps term_distribution takes, estimated from the size of its tables
+def term_work(count: int, sides: int, keep: int, highest: bool = False, mode: str = "", reroll: int = 0,
+              reroll_once: bool = False, explode: bool = False, success: str = "", target: int = 0) -> int:
+    if success and not explode:
+        return count
+    if explode or reroll_once and keep == count:
+        values = len(chain_distribution(sides, reroll, reroll_once, explode, success, target))
+        return count * count * values * values
+    if reroll_once:
+        return count * sides * sides * keep * keep // 4
+    sides -= reroll
+    if keep == count:
+        return count * count * sides
+    # keep_highest_counts visits about a quarter of the (face, dice, total) combinations
+    return count * sides * sides * keep * keep // 4
+
+
+# Number of different results of a term
+def term_size(count: int, sides: int, keep: int, highest: bool = False, mode: str = "", reroll: int = 0,
+              reroll_once: bool = False, explode: bool = False, success: str = "", target: int = 0) -> int:
+    if success and not explode:
+        return keep + 1
+    if explode:
+        chain = chain_distribution(sides, reroll, reroll_once, explode, success, target)
+        return count * (max(chain) - min(chain)) + 1
+    if reroll_once:
+        return keep * (sides - 1) + 1
+    return keep * (sides - reroll - 1) + 1
+
+
+# Number of results and steps tree_distribution takes for a tree
+def tree_work(node) -> tuple:
+    if isinstance(node, Constant):
+        return 1, 0
+    if isinstance(node, DiceTerm):
+        return term_size(*node.key), term_work(*node.key)
+    left_size, left_work = tree_work(node.left)
+    right_size, right_work = tree_work(node.right)
+    return left_size * right_size, left_work + right_work + left_size * right_size
+
+
+def pmf_moments(pmf: dict) -> Moments:
+    mean = sum(value * probability for value, probability in pmf.items())
+    variance = sum((value - mean) ** 2 * probability for value, probability in pmf.items())
+    return Moments(mean, variance, min(pmf), max(pmf))
+
+
+# Best/worst of independent rolls treated as normally distributed, for pools too big for a table
+def normal_best_of(moments: Moments, highest: bool, times: int = 2) -> Moments:
+    if times == 2:
+        shift, spread = 1 / math.sqrt(math.pi), 1 - 1 / math.pi
+    else:
+        shift, spread = standard_normal_max(times)
+    stdev = math.sqrt(moments.variance)
+    return moments._replace(
+        mean=moments.mean + shift * stdev if highest else moments.mean - shift * stdev,
+        variance=moments.variance * spread,
+    )
+
+
+# Mean and variance of the largest of n standard normals, integrated numerically
+@functools.lru_cache(maxsize=None)
+def standard_normal_max(n: int) -> tuple:
+    step = 0.001
+    mean = square = 0.0
+    for i in range(-10_000, 10_001):
+        z = i * step
+        density = n * math.exp(-z * z / 2) / math.sqrt(2 * math.pi) * (0.5 * math.erfc(-z / math.sqrt(2))) ** (n - 1)
+        mean += z * density * step
+        square += z * z * density * step
+    return mean, square - mean * mean
+
+
+# Exact mean of the k highest dice, summing min(k, dice showing at least face) over every face
+def keep_highest_mean(count: int, die: dict, keep: int) -> float:
+    log_ways = [math.lgamma(count + 1) - math.lgamma(showing + 1) - math.lgamma(count - showing + 1)
+                for showing in range(keep)]
+    faces = sorted(die)
+    total = float(keep * faces[0])
+    at_least = 1.0
+    for previous, face in zip(faces, faces[1:]):
+        at_least -= die[previous]
+        chance = min(at_least, 1.0)
+        if chance <= 0:
+            break
+        log_chance, log_miss = math.log(chance), math.log1p(-chance) if chance < 1 else -math.inf
+        # E[min(k, N)] is k minus what falls short when fewer than k dice reach the face
+        total += (face - previous) * (keep - sum(
+            (keep - showing) * math.exp(log_ways[showing] + showing * log_chance + (count - showing) * log_miss)
+            for showing in range(keep)
+        ))
+    return total
+
+
+# Exact mean and variance of the k highest dice, assigning faces from the top down like
+# keep_highest_counts but only keeping the first two moments of the kept total for each
+# number of dice assigned so far
+def keep_highest_moments(count: int, die: dict, keep: int):
+    log_factorials = [math.lgamma(i + 1) for i in range(count + 1)]
+    # dice assigned so far -> (probability, sum of probability * total, sum of probability * total ** 2)
+    states: dict = {0: (1.0, 0.0, 0.0)}
+    mean = square = 0.0
+    below = 1.0
+    steps = 0
+    for face in sorted(die, reverse=True):
+        chance = min(die[face] / below, 1.0) if below > 0 else 1.0
+        below -= die[face]
+        if chance <= 0:
+            continue
+        log_chance, log_miss = math.log(chance), math.log1p(-chance) if chance < 1 else -math.inf
+        next_states: dict = {}
+        for assigned, (probability, first, second) in states.items():
+            if probability < NEGLIGIBLE:
+                continue
+            remaining = count - assigned
+            needed = keep - assigned
+            showings = binomial_window(remaining, chance, needed)
+            steps += len(showings)
+            if steps > KEEP_MOMENTS_STEPS:
+                return None
+            rest = 1.0
+            for showing in showings:
+                ways = binomial(log_factorials, remaining, showing, log_chance, log_miss)
+                rest -= ways
+                added = showing * face
+                old = next_states.get(assigned + showing, (0.0, 0.0, 0.0))
+                next_states[assigned + showing] = (
+                    old[0] + probability * ways,
+                    old[1] + (first + probability * added) * ways,
+                    old[2] + (second + 2 * first * added + probability * added * added) * ways,
+                )
+            rest = max(rest, 0.0)
+            added = needed * face
+            mean += (first + probability * added) * rest
+            square += (second + 2 * first * added + probability * added * added) * rest
+        states = next_states
+    return mean, square - mean * mean
+
+
+# E[(Z - cut)+] of a normal Z, what it exceeds cut by on average
+def normal_excess(mean: float, variance: float, cut: float) -> float:
+    if variance <= 0:
+        return max(mean - cut, 0.0)
+    stdev = math.sqrt(variance)
+    z = (cut - mean) / stdev
+    density = math.exp(-z * z / 2) / math.sqrt(2 * math.pi)
+    return stdev * density + (mean - cut) * 0.5 * math.erfc(z / math.sqrt(2))
+
+
+# Mean and variance of the k highest dice for big pools of few faces. The kept total is
+# k * lowest face plus, for every higher face, the gap below it times min(k, N) with N the
+# dice showing at least that face. Most N are surely above or below k, only the few that
+# can land near k need their binomial summed, and pairs of those condition one N on the
+# other with the rest treated as normal. Exact when a single N can land near k, None once more
+# than KEEP_MOMENTS_STEPS steps are needed, or without pairs when it is not exact
+def keep_highest_split_moments(count: int, die: dict, keep: int, pairs: bool = True):
+    faces = sorted(die)
+    log_factorials = [math.lgamma(i + 1) for i in range(count + 1)]
+    # Chance of a die showing at least each face above the lowest, and the gap below that face
+    at_least: list = []
+    gaps: list = []
+    tail = 1.0
+    for previous, face in zip(faces, faces[1:]):
+        tail -= die[previous]
+        at_least.append(min(max(tail, 0.0), 1.0))
+        gaps.append(face - previous)
+
+    mean = float(keep * faces[0])
+    linear: list = []
+    near: list = []
+    for i, chance in enumerate(at_least):
+        expected = count * chance
+        spread = SPREAD * math.sqrt(expected * (1 - chance)) + 1
+        if expected - spread >= keep:
+            mean += gaps[i] * keep
+        elif expected + spread < keep:
+            linear.append(i)
+            mean += gaps[i] * expected
+        else:
+            near.append(i)
+    if len(near) > 1 and not pairs:
+        return None
+
+    # Counts of dice at least two faces are multinomial, Cov(N_i, N_j) = n * P(both) * (1 - P(either))
+    variance = sum(gaps[i] * gaps[j] * count * at_least[max(i, j)] * (1 - at_least[min(i, j)])
+                   for i in linear for j in linear)
+    steps = 0
+    tables: dict = {}
+    for t in near:
+        chance = at_least[t]
+        expected = count * chance
+        spread = SPREAD * math.sqrt(expected * (1 - chance)) + 1
+        showings = range(max(0, int(expected - spread)), min(count, int(expected + spread)) + 1)
+        steps += len(showings)
+        if steps > KEEP_MOMENTS_STEPS:
+            return None
+        log_chance, log_miss = math.log(chance), math.log1p(-chance) if chance < 1 else -math.inf
+        table = {showing: binomial(log_factorials, count, showing, log_chance, log_miss) for showing in showings}
+        kept = sum(probability * min(keep, showing) for showing, probability in table.items())
+        square = sum(probability * min(keep, showing) ** 2 for showing, probability in table.items())
+        # Cov(N, min(k, N)), every other count has a mean linear in N
+        spread_kept = sum(probability * showing * min(keep, showing) for showing, probability in table.items())
+        spread_kept -= expected * kept
+        tables[t] = table, kept
+        mean += gaps[t] * kept
+        variance += gaps[t] * gaps[t] * (square - kept * kept)
+        for u in linear:
+            slope = at_least[u] / chance if u > t else 1 - (at_least[u] - chance) / (1 - chance)
+            variance += 2 * gaps[u] * gaps[t] * slope * spread_kept
+
+    for a, s in enumerate(near):
+        for t in near[a + 1:]:
+            # The dice showing at least face s are those of face t plus a binomial share of the rest
+            table, kept_t = tables[t]
+            share = (at_least[s] - at_least[t]) / (1 - at_least[t])
+            steps += len(table)
+            if steps > KEEP_MOMENTS_STEPS:
+                return None
+            both = 0.0
+            for showing, probability in table.items():
+                if showing >= keep:
+                    both += probability * keep * keep
+                    continue
+                rest = (count - showing) * share
+                kept_s = showing + rest - normal_excess(rest, rest * (1 - share), keep - showing)
+                both += probability * showing * kept_s
+            variance += 2 * gaps[s] * gaps[t] * (both - tables[s][1] * kept_t)
+    return mean, variance
+
+
+# Keep highest/lowest of a big pool: the dice above the face the cut lands on
+# are all kept, the rest of the kept dice show that face
+def large_keep_moments(count: int, die: dict, keep: int, highest: bool) -> Moments:
+    if not highest:
+        # Lowest k are the highest k of the negated faces
+        mirrored = large_keep_moments(count, {-face: chance for face, chance in die.items()}, keep, True)
+        return Moments(-mirrored.mean, mirrored.variance, -mirrored.maximum, -mirrored.minimum)
+
+    faces = sorted(die)
+    moments = (keep_highest_split_moments(count, die, keep, pairs=False) or keep_highest_moments(count, die, keep)
+               or keep_highest_split_moments(count, die, keep))
+    if moments is not None:
+        return Moments(*moments, keep * faces[0], keep * faces[-1])
+
+    # Too many faces near the cut as well: the kept dice are about the ones above the face
+    # where k of n dice are expected to land, close for many faces but it overstates the
+    # variance when that face falls between two faces
+    above = 1.0
+    for cut in faces:
+        above -= die[cut]
+        if above * count <= keep + 1e-9:
+            break
+    mean_above = sum((face - cut) * chance for face, chance in die.items() if face > cut)
+    variance_above = sum((face - cut) ** 2 * chance for face, chance in die.items() if face > cut) - mean_above ** 2
+    mean = cut * keep + count * mean_above
+    if len(die) * keep <= EXACT_WORK:
+        mean = keep_highest_mean(count, die, keep)
+    return Moments(mean, count * variance_above, keep * faces[0], keep * faces[-1])
+
+
+# Smallest and largest total one die and its explosions can add, however unlikely
+def chain_range(sides: int, reroll: int = 0, reroll_once: bool = False, explode: bool = False,
+                success: str = "", target: int = 0) -> tuple:
+    faces = sorted(die_distribution(sides, reroll, reroll_once))
+    values = [int(COMPARISONS[success](face, target)) for face in faces] if success else faces
+    if not explode:
+        return min(values), max(values)
+    if len(values) == 1:
+        # The only face always explodes, as far as explosions go
+        return (MAX_EXPLOSIONS + 1) * values[0], (MAX_EXPLOSIONS + 1) * values[0]
+    return min(values[:-1]), MAX_EXPLOSIONS * values[-1] + max(values)
+
+
+# Moments of the sum of count dice, from the moments of one
+def sum_moments(count: int, sides: int, reroll: int = 0, reroll_once: bool = False, explode: bool = False,
+                success: str = "", target: int = 0) -> Moments:
+    if not (reroll or explode or success):
+        return Moments(count * (sides + 1) / 2, count * (sides * sides - 1) / 12, count, count * sides)
+    die = pmf_moments(chain_distribution(sides, reroll, reroll_once, explode, success, target))
+    minimum, maximum = chain_range(sides, reroll, reroll_once, explode, success, target)
+    return Moments(count * die.mean, count * die.variance, count * minimum, count * maximum)
+
+
+@functools.lru_cache(maxsize=None)
+def term_moments(count: int, sides: int, keep: int, highest: bool, mode: str, reroll: int = 0,
+                 reroll_once: bool = False, explode: bool = False, success: str = "", target: int = 0) -> Moments:
+    """Exact moments of one dice term, cached for every combination of its parameters
+
+    Sums of dice use the moments of one die, everything else a probability table
+    when it is small enough to build and large pool approximations when it is not.
+    """
+    key = (count, sides, keep, highest, mode, reroll, reroll_once, explode, success, target)
+    if keep == count and not mode:
+        return sum_moments(count, sides, reroll, reroll_once, explode, success, target)
+    if term_work(*key) <= EXACT_WORK:
+        return pmf_moments(term_distribution(*key))
+
+    if keep == count:
+        moments = sum_moments(count, sides, reroll, reroll_once, explode, success, target)
+    else:
+        die = die_distribution(sides, reroll, reroll_once)
+        # Best of needs the whole table, the moments alone are cheaper otherwise
+        pmf = keep_distribution(count, die, keep, highest, KEEP_MOMENTS_STEPS) if mode else None
+        if pmf is not None:
+            # The table leaves out the least likely totals, the range comes from the faces
+            pmf = best_of(pmf, mode == "A") if mode else pmf
+            return pmf_moments(pmf)._replace(minimum=keep * min(die), maximum=keep * max(die))
+        moments = large_keep_moments(count, die, keep, highest)
+    if mode:
+        moments = normal_best_of(moments, mode == "A")
+    return moments
+
+
+# Range of op applied to two ranges, from the corners
+def combine_range(node: BinOp, left: Moments, right: Moments) -> tuple:
+    corners: list = []
+    for a in (left.minimum, left.maximum):
+        for b in (right.minimum, right.maximum):
+            try:
+                corners.append(node.func(a, b))
+            except (ZeroDivisionError, OverflowError):
+                pass
+    if not corners:
+        return math.nan, math.nan
+    return min(corners), max(corners)
+
+
+# Moments of a tree from the moments of its terms, exact for +, - and *
+def combine_moments(node) -> Moments:
+    if isinstance(node, Constant):
+        return Moments(node.value, 0, node.value, node.value)
+    if isinstance(node, DiceTerm):
+        return term_moments(*node.key)
+
+    left = combine_moments(node.left)
+    right = combine_moments(node.right)
+    minimum, maximum = combine_range(node, left, right)
+    if node.op in ("+", "-"):
+        return Moments(node.func(left.mean, right.mean), left.variance + right.variance, minimum, maximum)
+    if node.op == "*":
+        variance = ((left.variance + left.mean ** 2) * (right.variance + right.mean ** 2)
+                    - (left.mean * right.mean) ** 2)
+        return Moments(left.mean * right.mean, variance, minimum, maximum)
+
+    # /, // and ** are non linear, first order approximation around the means
+    try:
+        mean = node.func(left.mean, right.mean)
+    except (ZeroDivisionError, OverflowError, ValueError):
+        return Moments(math.nan, math.nan, minimum, maximum)
+    try:
+        if node.op == "**":
+            slope_left = right.mean * left.mean ** (right.mean - 1)
+            slope_right = mean * math.log(left.mean) if left.mean > 0 else 0.0
+        else:
+            slope_left = 1 / right.mean
+            slope_right = -left.mean / right.mean ** 2
+        # A constant side adds nothing even when its slope is past the float range
+        variance = sum(slope * slope * side.variance for slope, side in ((slope_left, left), (slope_right, right))
+                       if side.variance)
+    except (ZeroDivisionError, OverflowError, ValueError):
+        variance = math.nan
+    return Moments(mean, variance, minimum, maximum)
+
+
+def linear(node) -> bool:
+    if isinstance(node, BinOp):
+        return node.op in LINEAR_OPERATORS and linear(node.left) and linear(node.right)
+    return True
+
+
+def expression_moments(tree, mode: str = "", times: int = 2) -> Moments:
+    """Mean, variance, minimum and maximum of a parsed expression
+
+    Args:
+        tree: Root of a parsed expression
+        mode (str): "a" or "d" for whole expression advantage/disadvantage
+        times (int): Rolls the best/worst is taken from with a mode
+
+    Returns:
+        (Moments): Exact wherever the probability tables are small enough to build
+    """
+    if mode or not linear(tree):
+        if tree_work(tree)[1] <= EXACT_WORK:
+            try:
+                pmf = tree_distribution(tree)
+                # Results past the float range, like 3**1d1000, overflow the moments as well
+                return pmf_moments(best_of(pmf, mode == "a", times) if mode else pmf)
+            except (ZeroDivisionError, OverflowError):
+                pass
+
+    moments = combine_moments(tree)
+    if mode:
+        moments = normal_best_of(moments, mode == "a", times)
+    return moments
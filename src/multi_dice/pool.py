@@ -0,0 +1,76 @@
+import itertools
+from array import array
+
+from .keep import keep_from_counts
+
+__all__ = ["FacePool"]
+
+# Pools with at least this many dice and few sides are rolled as a histogram of faces
+HISTOGRAM_MIN_DICE = 256
+
+
+def use_histogram(count: int, sides: int) -> bool:
+    return count >= HISTOGRAM_MIN_DICE and sides * 4 <= count
+
+
+# Rolled pool stored as face counts, the individual dice are only built when iterated
+class FacePool:
+    __slots__ = ("counts",)
+
+    def __init__(self, counts: list) -> None:
+        self.counts: list = counts
+
+    # Total of the pool, or of only the kept dice when keep is given
+    def total(self, keep: int = None, highest: bool = True) -> int:
+        if keep is None:
+            return sum(face * showing for face, showing in enumerate(self.counts))
+        return keep_from_counts(self.counts, keep, highest)
+
+    @property
+    def highest_face(self) -> int:
+        for face in range(len(self.counts) - 1, 0, -1):
+            if self.counts[face]:
+                return face
+        return 0
+
+    # Dice in ascending face order, the order they were rolled in is not kept
+    def __iter__(self):
+        for face, showing in enumerate(self.counts):
+            yield from itertools.repeat(face, showing)
+
+    def __len__(self) -> int:
+        return sum(self.counts)
+
+    def __repr__(self) -> str:
+        return f"FacePool({self.counts[1:]})"
+
+
+# Smallest array typecode that holds every face of a die
+def typecode(sides: int) -> str:
+    if sides < 1 << 8:
+        return "B"
+    if sides < 1 << 16:
+        return "H"
+    return "I"
+
+
+# Compact copy of a term's rolls for results that are kept around
+def pack_rolls(rolls, code: str):
+    if isinstance(rolls, FacePool):
+        return FacePool(array("I", rolls.counts))
+    return array(code, rolls)
+
+
+# Highest die of a term, without building the dice of a FacePool, 0 when no dice were rolled
+def highest_roll(rolls) -> int:
+    if isinstance(rolls, FacePool):
+        return rolls.highest_face
+    return max(rolls, default=0)
+
+
+# Dice of a term at or above crit_val, showing its highest face and showing a 1, counted in bulk
+def face_tally(rolls, sides: int, crit_val: int) -> tuple:
+    if isinstance(rolls, FacePool):
+        counts = rolls.counts
+        return sum(counts[max(crit_val, 0):]), counts[sides], counts[1]
+    return sum(map(crit_val.__le__, rolls)), rolls.count(sides), rolls.count(1)
@@ -0,0 +1,208 @@
+import bisect
+import functools
+import itertools
+import math
+from collections import Counter
+
+from .canonical import canonicalize
+from .compiled import DEFAULT_CACHE_SIZE, compile_dice
+from .pmf import best_of, tree_distribution, tree_work
+from .store import DEFAULT_MAX_ENTRIES, DEFAULT_MAX_VALUES, DistributionCache
+from .vectorized import roll_many
+
+__all__ = [
+    "Distribution", "distribution", "set_distribution_cache", "distribution_cache_info", "DistributionCache",
+    "prob_at_least", "cdf", "percentile", "compare",
+]
+
+# Queries fall back to Monte Carlo for expressions whose exact distribution takes more steps than this
+QUERY_EXACT_WORK = 2_000_000
+
+# distribution() refuses expressions that take more steps than this, several seconds of work
+MAX_EXACT_WORK = 20_000_000
+
+# Largest error allowed in any estimated cumulative probability, at 99% confidence
+MONTE_CARLO_TOLERANCE = 0.005
+MONTE_CARLO_CONFIDENCE = 0.99
+
+
+# Exact probability of every possible result, as a dict of value: probability
+class Distribution(dict):
+    @property
+    def mean(self) -> float:
+        return sum(value * probability for value, probability in self.items())
+
+    @property
+    def variance(self) -> float:
+        mean = self.mean
+        return sum((value - mean) ** 2 * probability for value, probability in self.items())
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def minimum(self):
+        return min(self)
+
+    @property
+    def maximum(self):
+        return max(self)
+
+    # Sorted results and the chance of rolling each one or lower, built on the first query
+    @functools.cached_property
+    def table(self) -> tuple:
+        values = sorted(self)
+        return values, list(itertools.accumulate(self[value] for value in values))
+
+    # Chance of rolling each sorted result or higher, summed from the top so the tail has no residue
+    @functools.cached_property
+    def upper_tail(self) -> list:
+        values = self.table[0]
+        return list(itertools.accumulate(self[value] for value in reversed(values)))[::-1]
+
+    def at_least(self, target) -> float:
+        """Chance of rolling target or higher, e.g. meeting a DC"""
+        values = self.table[0]
+        below = bisect.bisect_left(values, target)
+        if not below:
+            return 1.0
+        return min(1.0, self.upper_tail[below]) if below < len(values) else 0.0
+
+    def at_most(self, target) -> float:
+        """Chance of rolling target or lower"""
+        values, cumulative = self.table
+        below = bisect.bisect_right(values, target)
+        return min(1.0, cumulative[below - 1]) if below else 0.0
+
+    def percentile(self, q: float):
+        """Smallest result whose cumulative probability reaches q (0-100)"""
+        values, cumulative = self.table
+        return values[min(bisect.bisect_left(cumulative, q / 100 - 1e-12), len(values) - 1)]
+
+    def cdf(self) -> dict:
+        """Chance of rolling each result or lower, as a dict of value: probability"""
+        return dict(zip(*self.table))
+
+
+def distribution(dice: str) -> Distribution:
+    """Calculates the exact probability of every result of a dice string
+
+    Args:
+        dice (str): The dice rolling string
+
+    Returns:
+        (Distribution): dict of result: probability, sorted by result, shared between calls
+    """
+    return cache.get(canonicalize(dice), exact_distribution)
+
+
+def exact_distribution(dice: str) -> Distribution:
+    compiled = compile_dice(dice)
+    work = tree_work(compiled.tree)[1]
+    if work > MAX_EXACT_WORK:
+        raise ValueError(f"Exact distribution of {dice!r} is too expensive, about {work:,} steps "
+                         f"for a limit of {MAX_EXACT_WORK:,}")
+    pmf = tree_distribution(compiled.tree)
+    if compiled.mode:
+        pmf = best_of(pmf, compiled.mode == "a", compiled.times)
+    return Distribution(sorted(pmf.items()))
+
+
+cache = DistributionCache(factory=Distribution)
+
+
+def set_distribution_cache(path=None, max_entries: int = DEFAULT_MAX_ENTRIES, max_values: int = DEFAULT_MAX_VALUES,
+                           max_disk_bytes: int = None) -> DistributionCache:
+    """Replaces the distribution cache, e.g. with one kept in a file so restarted processes start warm
+
+    Args:
+        path: Optional SQLite file shared between processes
+        max_entries (int): Distributions kept in memory
+        max_values (int): Results kept in memory across every distribution
+        max_disk_bytes (int): Size the file is trimmed to, least recently used first, None for no limit
+
+    Returns:
+        (DistributionCache): The new cache
+    """
+    global cache
+    cache.close()
+    cache = DistributionCache(path, max_entries, max_values, max_disk_bytes, factory=Distribution)
+    query_distribution.cache_clear()
+    return cache
+
+
+def distribution_cache_info() -> dict:
+    return cache.info()
+
+
+# Fixed number of rolls after which every cumulative probability is within the tolerance (DKW
+# inequality), 105,967 with the defaults. It does not stop early on easy expressions
+def estimate_distribution(dice: str, tolerance: float = MONTE_CARLO_TOLERANCE,
+                          confidence: float = MONTE_CARLO_CONFIDENCE) -> Distribution:
+    trials = math.ceil(math.log(2 / (1 - confidence)) / (2 * tolerance ** 2))
+    values = roll_many(dice, trials)
+    if not isinstance(values, list):
+        values = values.tolist()
+    return Distribution((value, showing / trials) for value, showing in sorted(Counter(values).items()))
+
+
+# Exact distribution when it is cheap enough to work out, otherwise a Monte Carlo estimate
+@functools.lru_cache(maxsize=DEFAULT_CACHE_SIZE)
+def query_distribution(dice: str) -> Distribution:
+    if tree_work(compile_dice(dice).tree)[1] <= QUERY_EXACT_WORK:
+        return distribution(dice)
+    return estimate_distribution(dice)
+
+
+def prob_at_least(dice: str, target) -> float:
+    """Chance a dice string rolls target or higher
+
+    Args:
+        dice (str): The dice rolling string
+        target: Result to meet or beat
+
+    Returns:
+        (float): Probability from 0 to 1
+    """
+    return query_distribution(canonicalize(dice)).at_least(target)
+
+
+def cdf(dice: str) -> dict:
+    """Cumulative distribution of a dice string
+
+    Args:
+        dice (str): The dice rolling string
+
+    Returns:
+        (dict): result: chance of rolling that result or lower, sorted by result
+    """
+    return query_distribution(canonicalize(dice)).cdf()
+
+
+def percentile(dice: str, q: float):
+    """Smallest result a dice string reaches with at least q percent chance of rolling it or lower
+
+    Args:
+        dice (str): The dice rolling string
+        q (float): Percentile from 0 to 100
+
+    Returns:
+        Result at the percentile
+    """
+    return query_distribution(canonicalize(dice)).percentile(q)
+
+
+def compare(dice_a: str, dice_b: str) -> float:
+    """Chance the first dice string rolls higher than the second, e.g. an opposed check
+
+    Args:
+        dice_a (str): The dice rolling string that has to roll higher
+        dice_b (str): The dice rolling string it is compared against
+
+    Returns:
+        (float): P(A > B) from 0 to 1
+    """
+    first = query_distribution(canonicalize(dice_a))
+    second = query_distribution(canonicalize(dice_b))
+    return sum(probability * (1 - first.at_most(value)) for value, probability in second.items())
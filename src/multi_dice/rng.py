@@ -0,0 +1,212 @@
+import abc
+import functools
+import os
+import random
+import sys
+
+__all__ = ["RNGBackend", "StdlibRNG", "NumpyRNG", "BufferedRandom", "as_rng"]
+
+# memoryview cast codes for 1, 2, 4 and 8 byte unsigned values
+WIDTH_CODES = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+# Below this many dice the per die randint call is cheaper than a bulk draw
+BULK_MIN_DICE = 8
+
+
+# Unbiased die faces from a function returning n random bytes, by rejection sampling
+def faces_from_bytes(getbytes, count: int, sides: int) -> list:
+    bits = (sides - 1).bit_length()
+    if not bits:
+        return [1] * count
+    if bits > 64:
+        raise ValueError(f"Too many sides for a bulk draw: {sides}")
+
+    width = 1 if bits <= 8 else 2 if bits <= 16 else 4 if bits <= 32 else 8
+    code = WIDTH_CODES[width]
+    mask = (1 << bits) - 1
+
+    faces: list = []
+    needed = count
+    while needed > 0:
+        # Masking to the bit length keeps at least half of the values
+        batch = needed + (needed >> 1) + 4
+        values = memoryview(getbytes(batch * width)).cast(code)
+        faces.extend([value + 1 for value in [value & mask for value in values] if value < sides][:needed])
+        needed = count - len(faces)
+    return faces
+
+
+# NumPy is an optional extra, only imported the first time a fallback needs it
+@functools.lru_cache(maxsize=None)
+def load_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+# Shared face count sampling, one multinomial draw when the backend can do it
+def sample_counts(rng, count: int, sides: int) -> list:
+    counts: list = [0] * (sides + 1)
+
+    # Python 3.12+, a chain of conditional binomials is one multinomial draw
+    binomialvariate = getattr(rng, "binomialvariate", None)
+    if binomialvariate is not None:
+        remaining = count
+        for face in range(1, sides):
+            showing = binomialvariate(remaining, 1 / (sides - face + 1))
+            counts[face] = showing
+            remaining -= showing
+            if not remaining:
+                return counts
+        counts[sides] = remaining
+        return counts
+
+    # A NumPy generator seeded from a secure source would only be as unpredictable as its 64 bit seed
+    np = None if rng.secure else load_numpy()
+    if np is not None:
+        generator = np.random.default_rng(rng.getrandbits(64))
+        counts[1:] = generator.multinomial(count, [1 / sides] * sides).tolist()
+        return counts
+
+    return count_faces(rng, count, sides)
+
+
+# Face counts tallied from individual faces, the same on every Python version with or without NumPy
+def count_faces(rng, count: int, sides: int) -> list:
+    counts: list = [0] * (sides + 1)
+    for face in rng.faces(count, sides):
+        counts[face] += 1
+    return counts
+
+
+# Base for sources of dice: faces(count, sides), counts(count, sides), randint(a, b) and getrandbits(k)
+class RNGBackend(abc.ABC):
+    # Secure sources are never used to seed a NumPy generator, every die is drawn from the source itself
+    secure: bool = False
+
+    @abc.abstractmethod
+    def faces(self, count: int, sides: int) -> list:
+        """Faces of count dice with the given sides, each from 1 to sides"""
+
+    def counts(self, count: int, sides: int) -> list:
+        return sample_counts(self, count, sides)
+
+
+# random.Random, secrets.SystemRandom or the random module itself
+class StdlibRNG(RNGBackend):
+    def __init__(self, source=random) -> None:
+        self.source = source
+        self.secure: bool = isinstance(source, random.SystemRandom)
+        self.randint = source.randint
+        self.getrandbits = source.getrandbits
+        binomialvariate = getattr(source, "binomialvariate", None)
+        if binomialvariate is not None:
+            self.binomialvariate = binomialvariate
+
+    def faces(self, count: int, sides: int) -> list:
+        if count < BULK_MIN_DICE:
+            randint = self.randint
+            return [randint(1, sides) for _ in range(count)]
+        return faces_from_bytes(self.getbytes, count, sides)
+
+    def getbytes(self, n: int) -> bytes:
+        return self.getrandbits(n * 8).to_bytes(n, "little")
+
+    def __repr__(self) -> str:
+        return f"StdlibRNG({self.source!r})"
+
+
+# numpy.random.Generator, dice come from Generator.integers
+class NumpyRNG(RNGBackend):
+    def __init__(self, generator) -> None:
+        self.generator = generator
+
+    def randint(self, a: int, b: int) -> int:
+        return int(self.generator.integers(a, b + 1))
+
+    def getrandbits(self, k: int) -> int:
+        return int.from_bytes(self.generator.bytes((k + 7) // 8), "little") >> (-k % 8)
+
+    def faces(self, count: int, sides: int) -> list:
+        return self.generator.integers(1, sides + 1, size=count).tolist()
+
+    def counts(self, count: int, sides: int) -> list:
+        return [0, *self.generator.multinomial(count, [1 / sides] * sides).tolist()]
+
+    def __repr__(self) -> str:
+        return f"NumpyRNG({self.generator!r})"
+
+
+# Prefetches random bytes in big chunks and slices die faces out of them
+class BufferedRandom(RNGBackend):
+    def __init__(self, seed=None, chunk: int = 65536) -> None:
+        """Buffered backend, seeded runs are reproducible, unseeded ones read os.urandom
+
+        Args:
+            seed: Optional seed for a reproducible stream
+            chunk (int): Bytes fetched from the source at a time
+        """
+        self.seed = seed
+        self.chunk: int = chunk
+        self.secure: bool = seed is None
+        if seed is None:
+            self.source = os.urandom
+        else:
+            source = random.Random(seed)
+            self.source = lambda n: source.getrandbits(n * 8).to_bytes(n, "little")
+        self.buffer: bytes = b""
+        self.position: int = 0
+
+    def getbytes(self, n: int) -> bytes:
+        end = self.position + n
+        if end > len(self.buffer):
+            leftover = self.buffer[self.position:]
+            self.buffer = leftover + self.source(max(self.chunk, n - len(leftover)))
+            self.position, end = 0, n
+        data = self.buffer[self.position:end]
+        self.position = end
+        return data
+
+    def randint(self, a: int, b: int) -> int:
+        return faces_from_bytes(self.getbytes, 1, b - a + 1)[0] + a - 1
+
+    def getrandbits(self, k: int) -> int:
+        return int.from_bytes(self.getbytes((k + 7) // 8), "little") >> (-k % 8)
+
+    def faces(self, count: int, sides: int) -> list:
+        return faces_from_bytes(self.getbytes, count, sides)
+
+    def __repr__(self) -> str:
+        return f"BufferedRandom(seed={self.seed!r})"
+
+
+DEFAULT_RNG = StdlibRNG(random)
+
+
+def as_rng(rng=None):
+    """Turns anything usable as a source of dice into an RNG backend
+
+    Args:
+        rng: None for the random module, an int seed, a random.Random or
+            secrets.SystemRandom, a numpy Generator or an existing backend
+
+    Returns:
+        Backend with faces, counts, randint and getrandbits methods
+    """
+    if rng is None:
+        return DEFAULT_RNG
+    if isinstance(rng, RNGBackend):
+        return rng
+    if isinstance(rng, int) and not isinstance(rng, bool):
+        return StdlibRNG(random.Random(rng))
+    if isinstance(rng, random.Random) or rng is random:
+        return StdlibRNG(rng)
+    # A numpy Generator can only exist once numpy has been imported
+    np = sys.modules.get("numpy")
+    if np is not None and isinstance(rng, np.random.Generator):
+        return NumpyRNG(rng)
+    if hasattr(rng, "faces") and hasattr(rng, "counts"):
+        return rng
+    raise TypeError(f"Unsupported random number generator: {rng!r}")
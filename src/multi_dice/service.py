@@ -0,0 +1,146 @@
+import asyncio
+import random
+import time
+from collections import deque
+
+from .canonical import canonicalize
+from .compiled import compile_dice
+from .parser import DiceTerm
+from .rng import as_rng
+from .vectorized import is_secure, roll_many
+
+__all__ = ["AsyncDiceRoller"]
+
+# Batches drawing more dice than this are rolled off the event loop
+DEFAULT_OFFLOAD_DICE = 20_000
+
+# Latencies kept per expression for the percentiles
+LATENCY_SAMPLES = 10_000
+
+
+# Dice drawn for one roll of a compiled expression
+def dice_per_roll(compiled) -> int:
+    total = sum(term.count * (2 if term.mode else 1) for term in compiled.terms if isinstance(term, DiceTerm))
+    return total * compiled.times
+
+
+# Values of a whole batch, top level so process pools can pickle it.
+# Secure batches draw from the OS entropy source in the worker instead of a seed
+def roll_batch_values(dice: str, n: int, seed, rng=None) -> list:
+    if seed is None and rng is None:
+        rng = random.SystemRandom()
+    values = roll_many(dice, n, seed=seed, rng=rng)
+    return values if isinstance(values, list) else values.tolist()
+
+
+def percentile(samples: list, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class AsyncDiceRoller:
+    def __init__(self, rng=None, executor=None, offload_dice: int = DEFAULT_OFFLOAD_DICE, window: float = 0.0) -> None:
+        """Rolls dice for many concurrent callers, batching requests for the same expression
+
+        Args:
+            rng: Optional random number generator or seed every batch seed is drawn from,
+                secure sources roll every batch themselves
+            executor: Thread or process pool for heavy batches, None for the loop's default
+            offload_dice (int): Batches drawing more dice than this leave the event loop
+            window (float): Seconds to wait collecting requests before rolling a batch
+        """
+        self.rng = as_rng(rng)
+        self.executor = executor
+        self.offload_dice: int = offload_dice
+        self.window: float = window
+        self.waiting: dict = {}
+        self.latencies: dict = {}
+        self.batches: int = 0
+
+    async def roll(self, dice: str = "1d6"):
+        """Rolls dice like multi_dice.roll without blocking the event loop
+
+        Args:
+            dice (str): The dice rolling string
+
+        Returns:
+            Result of the roll
+        """
+        start = time.perf_counter()
+        # Strings with the same distribution share a batch
+        compiled = compile_dice(canonicalize(dice))
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        waiters = self.waiting.get(compiled.dice)
+        if waiters is None:
+            waiters = self.waiting[compiled.dice] = []
+            if self.window:
+                loop.call_later(self.window, self.flush, compiled)
+            else:
+                loop.call_soon(self.flush, compiled)
+        waiters.append(future)
+
+        value = await future
+        latencies = self.latencies.get(compiled.dice)
+        if latencies is None:
+            latencies = self.latencies[compiled.dice] = deque(maxlen=LATENCY_SAMPLES)
+        latencies.append(time.perf_counter() - start)
+        return value
+
+    # Roll everything collected for one expression as a single batch
+    def flush(self, compiled) -> None:
+        waiters = self.waiting.pop(compiled.dice)
+        # A secure source is never narrowed down to a NumPy seed
+        secure = is_secure(self.rng)
+        seed = None if secure else self.rng.getrandbits(64)
+        self.batches += 1
+
+        if dice_per_roll(compiled) * len(waiters) <= self.offload_dice:
+            try:
+                values = roll_batch_values(compiled.dice, len(waiters), seed, self.rng if secure else None)
+            except Exception as error:
+                self.fail(waiters, error)
+                return
+            self.resolve(waiters, values)
+            return
+
+        loop = asyncio.get_running_loop()
+        batch = loop.run_in_executor(self.executor, roll_batch_values, compiled.dice, len(waiters), seed)
+        batch.add_done_callback(lambda done: self.finish(waiters, done))
+
+    def finish(self, waiters: list, done) -> None:
+        if done.cancelled():
+            self.fail(waiters, asyncio.CancelledError())
+        elif done.exception() is not None:
+            self.fail(waiters, done.exception())
+        else:
+            self.resolve(waiters, done.result())
+
+    @staticmethod
+    def resolve(waiters: list, values: list) -> None:
+        for future, value in zip(waiters, values):
+            if not future.done():
+                future.set_result(value)
+
+    @staticmethod
+    def fail(waiters: list, error: Exception) -> None:
+        for future in waiters:
+            if not future.done():
+                future.set_exception(error)
+
+    def stats(self) -> dict:
+        """Latency per expression in seconds
+
+        Returns:
+            (dict): canonical dice string: {"count", "p50", "p99", "max"}
+        """
+        return {
+            dice: {
+                "count": len(samples),
+                "p50": percentile(samples, 50),
+                "p99": percentile(samples, 99),
+                "max": max(samples),
+            }
+            for dice, samples in self.latencies.items() if samples
+        }
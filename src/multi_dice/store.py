@@ -0,0 +1,154 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+__all__ = ["DistributionCache"]
+
+DEFAULT_MAX_ENTRIES = 1024
+
+# Probabilities held in memory across every cached distribution
+DEFAULT_MAX_VALUES = 2_000_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS distributions (
+    key TEXT PRIMARY KEY,
+    pmf TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    used REAL NOT NULL
+)
+"""
+
+
+# Distributions by expression, hot ones in a bounded in memory LRU and every one in an optional SQLite file
+class DistributionCache:
+    def __init__(self, path=None, max_entries: int = DEFAULT_MAX_ENTRIES, max_values: int = DEFAULT_MAX_VALUES,
+                 max_disk_bytes: int = None, factory=dict) -> None:
+        """Cache of value: probability dicts keyed by normalized expression
+
+        Args:
+            path: Optional SQLite file that keeps distributions between processes
+            max_entries (int): Distributions kept in memory
+            max_values (int): Results kept in memory across every distribution
+            max_disk_bytes (int): Size the file is trimmed to, least recently used first, None for no limit
+            factory: Type distributions loaded from the file are turned into
+        """
+        self.path = path
+        self.max_entries: int = max_entries
+        self.max_values: int = max_values
+        self.max_disk_bytes: int = max_disk_bytes
+        self.factory = factory
+        self.entries: OrderedDict = OrderedDict()
+        self.values: int = 0
+        self.hits: int = 0
+        self.disk_hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.lock = threading.Lock()
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self.connection.execute(SCHEMA)
+            self.connection.commit()
+
+    def get(self, key: str, compute):
+        """Cached distribution of key, calling compute(key) only when neither memory nor the file has it"""
+        with self.lock:
+            pmf = self.entries.get(key)
+            if pmf is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return pmf
+
+        pmf = self.load(key)
+        if pmf is None:
+            pmf = compute(key)
+            self.save(key, pmf)
+            with self.lock:
+                self.misses += 1
+        else:
+            with self.lock:
+                self.disk_hits += 1
+
+        with self.lock:
+            self.remember(key, pmf)
+        return pmf
+
+    # Keep in memory, evicting least recently used entries past either limit
+    def remember(self, key: str, pmf) -> None:
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.values -= len(previous)
+        self.entries[key] = pmf
+        self.values += len(pmf)
+        while len(self.entries) > 1 and (len(self.entries) > self.max_entries or self.values > self.max_values):
+            _, evicted = self.entries.popitem(last=False)
+            self.values -= len(evicted)
+            self.evictions += 1
+
+    def load(self, key: str):
+        if self.connection is None:
+            return None
+        with self.lock:
+            row = self.connection.execute("SELECT pmf FROM distributions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE distributions SET used = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+        values, probabilities = json.loads(row[0])
+        return self.factory(zip(values, probabilities))
+
+    def save(self, key: str, pmf) -> None:
+        if self.connection is None:
+            return
+        text = json.dumps([list(pmf), list(pmf.values())])
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO distributions VALUES (?, ?, ?, ?)",
+                                    (key, text, len(text), time.time()))
+            if self.max_disk_bytes is not None:
+                self.trim()
+            self.connection.commit()
+
+    # Drop least recently used rows until the stored distributions fit in max_disk_bytes
+    def trim(self) -> None:
+        total = self.connection.execute("SELECT COALESCE(SUM(bytes), 0) FROM distributions").fetchone()[0]
+        rows = self.connection.execute("SELECT key, bytes FROM distributions ORDER BY used").fetchall()
+        for key, size in rows[:-1]:
+            if total <= self.max_disk_bytes:
+                break
+            self.connection.execute("DELETE FROM distributions WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self) -> None:
+        """Empties memory and the file"""
+        with self.lock:
+            self.entries.clear()
+            self.values = 0
+            if self.connection is not None:
+                self.connection.execute("DELETE FROM distributions")
+                self.connection.commit()
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def info(self) -> dict:
+        """Hit/miss counters and current size
+
+        Returns:
+            (dict): hits, disk_hits, misses, evictions, entries and values
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "values": self.values,
+            }
+
+    def __repr__(self) -> str:
+        return f"DistributionCache(path={self.path!r})"
@@ -0,0 +1,73 @@
+import asyncio
+from collections import namedtuple
+
+from .compiled import compile_dice
+from .rng import as_rng
+from .vectorized import is_secure, np, numpy_generator, roll_compiled_many, rolls_per_chunk
+
+__all__ = ["StreamRoll", "roll_stream", "aroll_stream"]
+
+DEFAULT_CHUNK = 4096
+
+# Lightweight result yielded by the streams, value and crit match RollDice
+StreamRoll = namedtuple("StreamRoll", ["value", "crit"])
+
+
+# Function returning the next chunk of rolls, everything it needs is set up once
+def chunk_maker(dice: str, rng, chunk: int, crit_val: int):
+    compiled = compile_dice(dice)
+
+    if np is not None and not is_secure(rng):
+        generator = numpy_generator(None, rng)
+        chunk = min(chunk, rolls_per_chunk(compiled))
+
+        def make_chunk() -> list:
+            values, crits = roll_compiled_many(compiled, generator, chunk, crit_val)
+            return list(map(StreamRoll, values.tolist(), crits.tolist()))
+        return make_chunk
+
+    rng = as_rng(rng)
+
+    def make_chunk() -> list:
+        rolls: list = []
+        for _ in range(chunk):
+            value, _, crit = compiled.roll_expression(crit_val, rng)
+            rolls.append(StreamRoll(value, crit))
+        return rolls
+    return make_chunk
+
+
+def roll_stream(dice: str, rng=None, chunk: int = DEFAULT_CHUNK, crit: int = 20):
+    """Endless iterator of rolls of one dice string, generated chunk rolls at a time
+
+    Args:
+        dice (str): The dice rolling string
+        rng: Optional random number generator or seed, see as_rng
+        chunk (int): Rolls generated at a time, at most this many are buffered
+        crit (int): Value that causes critical hit
+
+    Returns:
+        Iterator of StreamRoll(value, crit)
+    """
+    make_chunk = chunk_maker(dice, rng, chunk, crit)
+    while True:
+        yield from make_chunk()
+
+
+async def aroll_stream(dice: str, rng=None, chunk: int = DEFAULT_CHUNK, crit: int = 20):
+    """Async version of roll_stream, chunks are generated in the default executor
+
+    The next chunk is generated while the current one is consumed, so at most
+    two chunks are buffered and a slow consumer holds the producer back.
+    """
+    loop = asyncio.get_running_loop()
+    make_chunk = chunk_maker(dice, rng, chunk, crit)
+    pending = loop.run_in_executor(None, make_chunk)
+    try:
+        while True:
+            rolls = await pending
+            pending = loop.run_in_executor(None, make_chunk)
+            for roll in rolls:
+                yield roll
+    finally:
+        pending.cancel()
@@ -0,0 +1,328 @@
+import random
+
+from .compiled import compile_dice
+from .crit import CritCounts, term_crits
+from .parser import COMPARISONS, MAX_EXPLOSIONS, OPERATORS, Constant, DiceTerm
+from .rng import NumpyRNG, as_rng
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is an optional extra
+    np = None
+
+__all__ = ["roll_many"]
+
+# Values drawn at once by vectorized rolls, about 80 MB of int64, bigger runs are rolled in chunks
+DRAW_BUDGET = 10_000_000
+
+
+# Roll one term n times, appending the highest and lowest die of each roll to extremes when given
+def roll_term_many(term: DiceTerm, generator, n: int, extremes: list = None):
+    if not term.count:
+        # No dice, the highest and lowest die are 0 like highest_roll of an empty term
+        if extremes is not None:
+            extremes.append((np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)))
+        return np.zeros(n, dtype=np.int64)
+    if extremes is not None and len(term.parts) > 1:
+        return roll_merged_many(term, generator, n, extremes)
+    sets = 2 if term.mode else 1
+    if term.explode:
+        roll_sets = roll_exploding_many
+    elif term.histogram:
+        roll_sets = roll_histogram_many
+    else:
+        roll_sets = roll_dice_many
+    totals, highs, lows = roll_sets(term, generator, (sets, n), extremes is not None)
+
+    second = None
+    if term.mode == "A":
+        second = totals[1] > totals[0]
+    elif term.mode == "D":
+        second = totals[1] < totals[0]
+
+    if extremes is not None:
+        if second is None:
+            extremes.append((highs[0], lows[0]))
+        else:
+            extremes.append((np.where(second, highs[1], highs[0]), np.where(second, lows[1], lows[0])))
+    if second is None:
+        return totals[0]
+    return np.where(second, totals[1], totals[0])
+
+
+# Rolls of an expression that fit in DRAW_BUDGET, every die is a value and a histogram pool one per face
+def rolls_per_chunk(compiled) -> int:
+    draws = sum((term.sides if term.histogram else term.count) * (2 if term.mode else 1)
+                for term in compiled.dice_terms)
+    return max(1, DRAW_BUDGET // max(draws, 1))
+
+
+# Sizes of the chunks n rolls are made in
+def chunk_sizes(n: int, step: int) -> list:
+    return [min(step, n - start) for start in range(0, n, step)] or [0]
+
+
+# Plain dice merged at compile time, with the highest and lowest die of every term they were written as
+def roll_merged_many(term: DiceTerm, generator, n: int, extremes: list):
+    draws = draw_many(term, generator, (n, term.count))
+    start = 0
+    for part in term.parts:
+        extremes.append((draws[:, start:start + part].max(axis=-1), draws[:, start:start + part].min(axis=-1)))
+        start += part
+    return draws.sum(axis=-1)
+
+
+# Faces of dice drawn with integers(), rerolls done on the whole array
+def draw_many(term: DiceTerm, generator, size):
+    if not term.reroll_once:
+        # Rerolling until above the threshold is rolling a smaller die above it
+        return generator.integers(term.reroll + 1, term.sides + 1, size=size)
+    draws = generator.integers(1, term.sides + 1, size=size)
+    low = draws <= term.reroll
+    draws[low] = generator.integers(1, term.sides + 1, size=int(low.sum()))
+    return draws
+
+
+# Dice that count as a success, as 0/1 ints
+def successes_many(term: DiceTerm, faces):
+    return COMPARISONS[term.success](faces, term.target).astype(np.int64)
+
+
+# Successes among the kept dice like parser.kept_successes, for arrays of success counts
+def kept_successes_many(term: DiceTerm, successes):
+    if term.keep == term.count:
+        return successes
+    if (term.success in (">=", ">")) == term.highest:
+        return np.minimum(successes, term.keep)
+    return np.maximum(successes - (term.count - term.keep), 0)
+
+
+# Every die drawn with a single integers() call
+def roll_dice_many(term: DiceTerm, generator, shape: tuple, want_extremes: bool):
+    draws = draw_many(term, generator, (*shape, term.count))
+    if term.success:
+        totals = kept_successes_many(term, successes_many(term, draws).sum(axis=-1))
+    elif term.keep == term.count:
+        totals = draws.sum(axis=-1)
+    elif not term.keep:
+        # Nothing kept, there is no element to partition around
+        totals = np.zeros(shape, dtype=np.int64)
+    elif term.highest:
+        cut = term.count - term.keep
+        totals = np.partition(draws, cut, axis=-1)[..., cut:].sum(axis=-1)
+    else:
+        totals = np.partition(draws, term.keep - 1, axis=-1)[..., :term.keep].sum(axis=-1)
+    if not want_extremes:
+        return totals, None, None
+    return totals, draws.max(axis=-1), draws.min(axis=-1)
+
+
+# Explosions drawn in bulk, one integers() call per round for the dice of every roll that exploded
+def roll_exploding_many(term: DiceTerm, generator, shape: tuple, want_extremes: bool):
+    draws = draw_many(term, generator, (*shape, term.count)).reshape(-1, term.count)
+    rolls = len(draws)
+    value = (lambda faces: successes_many(term, faces)) if term.success else (lambda faces: faces)
+    totals = value(draws).sum(axis=-1)
+    lows = draws.min(axis=-1) if want_extremes else None
+    exploding = (draws == term.sides).sum(axis=-1)
+    for _ in range(MAX_EXPLOSIONS):
+        extra_dice = int(exploding.sum())
+        if not extra_dice:
+            break
+        extra = draw_many(term, generator, extra_dice)
+        # Roll each extra die belongs to
+        owners = np.repeat(np.arange(rolls), exploding)
+        totals = totals + np.bincount(owners, weights=value(extra), minlength=rolls).astype(np.int64)
+        exploding = np.bincount(owners, weights=extra == term.sides, minlength=rolls).astype(np.int64)
+        if want_extremes:
+            np.minimum.at(lows, owners, extra)
+    if not want_extremes:
+        return totals.reshape(shape), None, None
+    # Explosions only follow the highest face, which is already the highest roll
+    return totals.reshape(shape), draws.max(axis=-1).reshape(shape), lows.reshape(shape)
+
+
+# Big pools with few sides only draw how many dice landed on each face
+def roll_histogram_many(term: DiceTerm, generator, shape: tuple, want_extremes: bool):
+    sides = term.sides - term.reroll
+    counts = generator.multinomial(term.count, [1 / sides] * sides, size=shape)
+    faces = np.arange(term.reroll + 1, term.sides + 1)
+    highs = lows = None
+    if want_extremes:
+        # Highest and lowest faces that came up at least once
+        highs = term.sides - np.argmax(counts[..., ::-1] > 0, axis=-1)
+        lows = term.reroll + 1 + np.argmax(counts > 0, axis=-1)
+    if term.success:
+        return kept_successes_many(term, counts @ successes_many(term, faces)), highs, lows
+    if term.keep == term.count:
+        return counts @ faces, highs, lows
+
+    if term.highest:
+        counts, faces = counts[..., ::-1], faces[::-1]
+    # Dice taken from each face once the best faces are used up
+    taken = np.cumsum(counts, axis=-1)
+    taken = np.minimum(taken, term.keep) - np.minimum(taken - counts, term.keep)
+    return taken @ faces, highs, lows
+
+
+# Evaluate a parsed tree for n rolls at once
+def roll_tree_many(node, generator, n: int, extremes: list = None):
+    if isinstance(node, Constant):
+        return node.value
+    if isinstance(node, DiceTerm):
+        return roll_term_many(node, generator, n, extremes)
+
+    left = roll_tree_many(node.left, generator, n, extremes)
+    right = roll_tree_many(node.right, generator, n, extremes)
+    if is_exact(left) or is_exact(right) or not fits_int64(node.op, left, right):
+        # int64 wraps around silently, keep exact Python ints like a single roll
+        left = np.asarray(left, dtype=object)
+        right = np.asarray(right, dtype=object)
+    return node.func(left, right)
+
+
+# Evaluate an expression n times, with the highest and lowest die of every dice term of the kept rolls
+def roll_compiled_extremes(compiled, generator, n: int, want_extremes: bool = True) -> tuple:
+    with np.errstate(divide="raise"):
+        try:
+            extremes = [] if want_extremes else None
+            values = roll_tree_many(compiled.tree, generator, n, extremes)
+            for _ in range(compiled.times - 1):
+                second_extremes = [] if want_extremes else None
+                second = roll_tree_many(compiled.tree, generator, n, second_extremes)
+                # Ties keep the reroll like RollDice.advantage/disadvantage
+                take = np.asarray(second >= values if compiled.mode == "a" else second <= values, dtype=bool)
+                values = np.where(take, second, values)
+                if want_extremes:
+                    extremes = [
+                        (np.where(take, high, first_high), np.where(take, low, first_low))
+                        for (first_high, first_low), (high, low) in zip(extremes, second_extremes)
+                    ]
+        except FloatingPointError:
+            raise ZeroDivisionError("division by zero") from None
+    return np.broadcast_to(values, (n,)).copy(), extremes
+
+
+# Evaluate an expression n times with its crits, the crit of the last dice term like RollDice
+def roll_compiled_many(compiled, generator, n: int, crit_val: int = None) -> tuple:
+    values, extremes = roll_compiled_extremes(compiled, generator, n, crit_val is not None)
+    if crit_val is None:
+        return values, None
+    if not extremes:
+        return values, np.zeros(n, dtype=bool)
+    return values, extremes[-1][0] >= crit_val
+
+
+# CritCounts of every dice term from the extremes of n rolls
+def crit_counts_many(compiled, extremes: list, crit_val: int) -> list:
+    return [
+        CritCounts(repr(term), len(highs), int(np.count_nonzero(highs >= crit_val)),
+                   int(np.count_nonzero(highs == term.sides)), int(np.count_nonzero(lows == 1)))
+        for term, (highs, lows) in zip(compiled.crit_terms, extremes)
+    ]
+
+
+# False when op on two integer arrays could leave int64, judged from the smallest and largest value of each side
+def fits_int64(op: str, left, right) -> bool:
+    if op == "**":
+        return power_fits(left, right)
+    if op not in ("+", "-", "*") or np.asarray(left).dtype.kind != "i" or np.asarray(right).dtype.kind != "i":
+        return True
+    func = OPERATORS[op]
+    sides = [(int(np.min(side)), int(np.max(side))) for side in (left, right)]
+    corners = [func(a, b) for a in sides[0] for b in sides[1]]
+    return -2 ** 63 <= min(corners) and max(corners) < 2 ** 63
+
+
+# Integer powers whose largest result still fits in int64
+def power_fits(left, right) -> bool:
+    if np.asarray(left).dtype.kind != "i" or np.asarray(right).dtype.kind != "i":
+        return False
+    base = int(np.max(np.abs(left)))
+    exponent = int(np.max(right))
+    if int(np.min(right)) < 0:
+        return False
+    return base < 2 or exponent * base.bit_length() < 63
+
+
+# Values that no longer fit in int64 arrays
+def is_exact(value) -> bool:
+    if isinstance(value, int):
+        return not -2 ** 63 <= value < 2 ** 63
+    return getattr(value, "dtype", None) == object
+
+
+# True for sources like secrets.SystemRandom that a NumPy generator seeded from them would weaken
+def is_secure(rng) -> bool:
+    return rng is not None and getattr(as_rng(rng), "secure", False)
+
+
+# NumPy Generator for a seed or any RNG backend that is not secure
+def numpy_generator(seed=None, rng=None):
+    if rng is None:
+        return np.random.default_rng(seed)
+    rng = as_rng(rng)
+    if isinstance(rng, NumpyRNG):
+        return rng.generator
+    return np.random.default_rng(rng.getrandbits(128))
+
+
+def roll_many(dice: str, n: int, seed=None, rng=None, crit: int = None):
+    """Rolls a dice string n times in one call
+
+    Args:
+        dice (str): The dice rolling string
+        n (int): Number of rolls
+        seed: Optional seed for reproducible results
+        rng: Optional random number generator used instead of seed, see as_rng
+        crit (int): Optional value that causes critical hit, also returns the crits when given
+
+    Returns:
+        NumPy array of n totals, or a list when NumPy is not installed. With crit,
+        (totals, crits, term_crits): whether each roll crit like RollDice.crit and
+        a CritCounts for every dice term
+    """
+    compiled = compile_dice(dice)
+
+    if np is None:
+        rng = as_rng(random.Random(seed) if rng is None else rng)
+        if crit is None:
+            return [compiled.roll_value(rng) for _ in range(n)]
+        return roll_many_fallback(compiled, rng, n, crit)
+    if is_secure(rng):
+        # Rolled one at a time from the source itself, then handed back as arrays like the vectorized path
+        rng = as_rng(rng)
+        if crit is None:
+            return np.array([compiled.roll_value(rng) for _ in range(n)])
+        values, crits, counts = roll_many_fallback(compiled, rng, n, crit)
+        return np.array(values), np.array(crits, dtype=bool), counts
+
+    generator = numpy_generator(seed, rng)
+    sizes = chunk_sizes(n, rolls_per_chunk(compiled))
+    if crit is None:
+        values = [roll_compiled_many(compiled, generator, size)[0] for size in sizes]
+        return values[0] if len(values) == 1 else np.concatenate(values)
+    values: list = []
+    crits: list = []
+    counts = None
+    for size in sizes:
+        chunk, extremes = roll_compiled_extremes(compiled, generator, size)
+        values.append(chunk)
+        crits.append(extremes[-1][0] >= crit if extremes else np.zeros(size, dtype=bool))
+        chunk_counts = crit_counts_many(compiled, extremes, crit)
+        counts = chunk_counts if counts is None else [total + more for total, more in zip(counts, chunk_counts)]
+    return np.concatenate(values), np.concatenate(crits), counts
+
+
+# roll_many() with crits one roll at a time
+def roll_many_fallback(compiled, rng, n: int, crit_val: int) -> tuple:
+    values: list = []
+    crits: list = []
+    counts = [CritCounts(repr(term), 0, 0, 0, 0) for term in compiled.crit_terms]
+    for _ in range(n):
+        value, term_rolls, crit = compiled.roll_expression(crit_val, rng)
+        values.append(value)
+        crits.append(crit)
+        counts = [total + CritCounts.of(term_crit)
+                  for total, term_crit in zip(counts, term_crits(compiled, term_rolls, crit_val))]
+    return values, crits, counts
@@ -0,0 +1,83 @@
+import pytest
+import multi_dice as dice
+
+EXPRESSIONS = ["1d20+5", "a4d6k3", "1000d6k10", "6d6!", "10d10>=7", "1d6/4", "(1d6+10)**40", "3"]
+
+
+def test_write_and_read(tmp_path):
+    path = tmp_path / "rolls.log"
+    with dice.AuditWriter(path, seed=3, buffer_bytes=256) as log:
+        rolls = [log.roll(expression, crit=19) for expression in EXPRESSIONS * 20]
+
+    with dice.AuditReader(path) as reader:
+        assert len(reader) == len(rolls)
+        for i, roll in enumerate(rolls):
+            record = reader[i]
+            assert (record.dice, record.seed, record.offset, record.crit_val) == (roll.dice, 3, i, 19)
+            assert (record.value, record.crit) == (roll.value, roll.crit)
+            assert [list(rolls) for rolls in record.term_rolls] == [list(rolls) for rolls in roll.term_rolls]
+
+
+def test_replay(tmp_path):
+    path = tmp_path / "rolls.log"
+    with dice.AuditWriter(path) as log:
+        rolls = [log.roll(expression) for expression in EXPRESSIONS]
+    with dice.AuditReader(path) as reader:
+        for i, roll in enumerate(rolls):
+            assert reader.replay(i).data == roll.data
+            assert reader.verify(i)
+
+
+def test_replay_without_numpy(tmp_path, monkeypatch):
+    path = tmp_path / "rolls.log"
+    with dice.AuditWriter(path, seed=5) as log:
+        rolls = [log.roll("1000d6k3") for _ in range(3)]
+    monkeypatch.setattr("multi_dice.rng.load_numpy", lambda: None)
+    with dice.AuditReader(path) as reader:
+        for i, roll in enumerate(rolls):
+            assert reader.verify(i)
+            assert reader.replay(i).value == roll.value
+
+
+def test_append_continues_session(tmp_path):
+    path = tmp_path / "rolls.log"
+    with dice.AuditWriter(path, seed=9) as log:
+        log.roll("1d20")
+    with dice.AuditWriter(path, seed=9) as log:
+        second = log.roll("1d20")
+    with dice.AuditReader(path) as reader:
+        assert reader.expressions == {0: "1d20"}
+        assert [record.offset for record in reader] == [0, 1]
+        assert reader[1].value == second.value == dice.RollDice("1d20", rng=dice.roll_seed(9, 1)).value
+
+
+def test_scan(tmp_path):
+    path = tmp_path / "rolls.log"
+    with dice.AuditWriter(path, seed=1) as log:
+        rolls = [log.roll(expression) for expression in ["1d20", "1d4"] * 200]
+    with dice.AuditReader(path) as reader:
+        assert list(reader.scan("1d20", crit=True)) == [i for i, roll in enumerate(rolls) if roll.crit]
+        assert len(list(reader.scan("1d4"))) == 200
+        assert list(reader.scan("2d6")) == []
+
+
+def test_partial_record_is_skipped(tmp_path):
+    path = tmp_path / "rolls.log"
+    with dice.AuditWriter(path, seed=1) as log:
+        log.roll("1d20")
+        log.roll("1d20")
+    path.write_bytes(path.read_bytes()[:-3])
+    with dice.AuditReader(path) as reader:
+        assert len(reader) == 1
+    with dice.AuditWriter(path, seed=1) as log:
+        log.roll("1d4")
+    with dice.AuditReader(path) as reader:
+        assert [record.dice for record in reader] == ["1d20", "1d4"]
+        assert reader.verify(1)
+
+
+def test_not_a_log(tmp_path):
+    path = tmp_path / "other.log"
+    path.write_bytes(b"{}")
+    with pytest.raises(ValueError):
+        dice.AuditReader(path)
@@ -0,0 +1,23 @@
+import multi_dice as dice
+
+
+def test_roll_batch_order_and_shape():
+    expressions = ["1d20+5", "4d6k3", "a1d20", "3", "1d20+5", "1000d6"]
+    results = dice.roll_batch(expressions)
+    assert [result["die"] for result in results] == expressions
+    assert set(results[0]) == set(dice.RollDice("1d20").data)
+    assert 6 <= results[0]["value"] <= 25
+    assert 3 <= results[1]["value"] <= 18 and len(results[1]["rolls"]) == 4
+    assert len(results[2]["rolls"]) == 1
+    assert results[3]["value"] == 3
+    assert len(results[5]["rolls"]) == 1000
+
+
+def test_roll_batch_seeded():
+    expressions = ["1d20", "A2d8k1+1d20", "d1d20", "8d6"] * 10
+    assert dice.roll_batch(expressions, rng=5) == dice.roll_batch(expressions, rng=5)
+
+
+def test_roll_batch_values_match_rolls():
+    for result in dice.roll_batch(["2d10+1d4"] * 200):
+        assert result["value"] == sum(result["rolls"])
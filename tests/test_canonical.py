@@ -0,0 +1,28 @@
+import pytest
+import multi_dice as dice
+from multi_dice.probability import exact_distribution
+
+
+def test_equivalent_strings():
+    assert {dice.canonicalize(expression) for expression in ("1d6+2", "2+1d6", " 1d6 + 2 ", "1d6+2^1")} == {"1d6+2"}
+    assert dice.canonicalize("1d6+1d6") == "2d6"
+    assert dice.canonicalize("2*1d6*3") == "1d6*6"
+    assert dice.canonicalize("a2+1d20") == "a1d20+2"
+    assert dice.canonicalize("1d8-(2-1d6)") == "1d6+1d8-2"
+    assert dice.canonicalize("4d6k3+1d1*5+0") == "4d6k3+5"
+    assert dice.canonical_key("2+1d6") == dice.canonical_key("1d6+2")
+    assert dice.canonical_key("1d6+3") != dice.canonical_key("1d6+2")
+
+
+@pytest.mark.parametrize("expression", [
+    "1d6+2", "1-3-1d6", "(1d4-1d4)*(2-5)", "d1d20+0", "2**3**2+1d4", "(1d4+1)**2", "1d6-(1d4-1d8)",
+    "1d6/2+1", "A2d6+D1d8*2", "(2d4)//(1d2+1)-3", "4d6l2+4d6l2",
+])
+def test_same_distribution(expression):
+    canonical = dice.canonicalize(expression)
+    assert dice.canonicalize(canonical) == canonical
+    assert exact_distribution(canonical) == pytest.approx(exact_distribution(dice.compile_dice(expression).dice))
+
+
+def test_canonical_cache_sharing():
+    assert dice.distribution("2+1d6") is dice.distribution("1d6+2")
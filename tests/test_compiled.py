@@ -0,0 +1,87 @@
+import pytest
+import multi_dice as dice
+
+
+def test_compile_dice_cached():
+    dice.clear_cache()
+    first = dice.compile_dice("4d6k3+2")
+    assert dice.compile_dice(" 4d6k3 + 2 ") is first
+    assert dice.cache_info().hits == 1
+
+
+def test_compiled_roll_range():
+    compiled = dice.compile_dice("4d6k3+2")
+    for _ in range(1, 1001):
+        value, rolls, crit = compiled.roll()
+        assert 5 <= value <= 20
+        assert len(rolls) == 4
+
+
+def test_compiled_stats():
+    compiled = dice.compile_dice("2d6+1")
+    assert compiled.minimum == 3
+    assert compiled.maximum == 13
+
+
+def test_set_cache_size():
+    dice.set_cache_size(2)
+    for expression in ("1d4", "1d6", "1d8"):
+        dice.compile_dice(expression)
+    assert dice.cache_info().currsize == 2
+    dice.set_cache_size()
+
+
+def test_compile_invalid():
+    with pytest.raises(ValueError):
+        dice.compile_dice("2d6k3")
+    with pytest.raises(SyntaxError):
+        dice.compile_dice("1d6+")
+
+
+def test_lazy_results():
+    roll = dice.RollDice("3d6+2")
+    assert roll._data is None and roll._rolls is None
+    assert roll.data["value"] == roll.value
+    assert roll.data["rolls"] == roll.rolls
+    assert (roll.average, roll.minimum, roll.maximum) == (roll.compiled.average, 5, 20)
+    assert "moments" in vars(roll.compiled)
+
+
+def test_compact_results():
+    roll = dice.RollDice("4d6k3+1d1000")
+    assert not hasattr(roll, "__dict__")
+    assert [rolls.typecode for rolls in roll.term_rolls] == ["B", "H"]
+    assert roll.rolls == [*roll.term_rolls[0], *roll.term_rolls[1]]
+    assert isinstance(roll.rolls, list)
+
+
+def test_best_and_worst_of_n():
+    assert (dice.compile_dice("a1d20").times, dice.compile_dice("a1d20", times=3).times) == (2, 3)
+    assert dice.compile_dice("d1d20+1", times=4).times == 4
+    assert dice.compile_dice("1d20", times=3).times == 1
+    for seed in range(30):
+        rng = dice.as_rng(seed)
+        values = [dice.compile_dice("1d20+1d4").roll_terms(rng=rng)[0] for _ in range(3)]
+        assert dice.RollDice("a1d20+1d4", rng=seed, times=3).value == max(values)
+        assert dice.RollDice("d1d20+1d4", rng=seed, times=3).value == min(values)
+    with pytest.raises(ValueError):
+        dice.compile_dice("a1d20", times=0)
+
+
+def test_repeated_prefix_is_advantage():
+    # Every "a" is stripped, so "aa1d20" is still best of two
+    assert dice.compile_dice("aa1d20").times == 2
+    assert dice.RollDice("aa1d20").average == pytest.approx(dice.RollDice("a1d20").average)
+
+
+def test_best_of_n_stats():
+    # Elven accuracy, best of three d20
+    assert dice.RollDice("a1d20", times=3).average == pytest.approx(sum(1 - ((x - 1) / 20) ** 3 for x in range(1, 21)))
+    assert dice.RollDice("d1d20", times=3).average == pytest.approx(sum(((21 - x) / 20) ** 3 for x in range(1, 21)))
+
+
+def test_advantage_single_parse():
+    dice.clear_cache()
+    dice.RollDice("a2d6+3")
+    dice.RollDice("a2d6+3", times=3)
+    assert dice.cache_info().misses == 2
@@ -0,0 +1,57 @@
+import pytest
+import multi_dice as dice
+
+
+def test_term_crits():
+    for seed in range(100):
+        roll = dice.RollDice("2d20+3d6+4", crit=19, rng=seed)
+        d20, d6 = roll.term_crits
+        assert d20.dice == "2d20" and d6.dice == "3d6"
+        rolls = list(roll.term_rolls[0])
+        assert d20.crits == sum(face >= 19 for face in rolls)
+        assert d20.crit == (d20.crits > 0)
+        assert d20.natural_max == rolls.count(20)
+        assert d20.natural_ones == rolls.count(1)
+        assert not d6.crit
+        # Constants after the last dice term leave its crit alone
+        assert roll.crit == d6.crit
+
+
+def test_term_crits_of_merged_dice():
+    for seed in range(50):
+        roll = dice.RollDice("1d20+1d20+1d20", rng=seed)
+        assert [crit.dice for crit in roll.term_crits] == ["1d20", "1d20", "1d20"]
+        assert [crit.crit for crit in roll.term_crits] == [face == 20 for face in roll.rolls]
+    assert [count.dice for count in dice.simulate("1d20+1d20+1d20", 1000, seed=1).term_crits] == ["1d20"] * 3
+
+
+def test_roll_many_crits_of_merged_dice():
+    pytest.importorskip("numpy")
+    _, _, counts = dice.roll_many("1d20+1d20+1d20", 10_000, seed=1, crit=20)
+    assert [count.dice for count in counts] == ["1d20", "1d20", "1d20"]
+    assert all(count.crit_rate == pytest.approx(0.05, abs=0.01) for count in counts)
+
+
+def test_term_crits_of_pools():
+    roll = dice.RollDice("1000d6", crit=6, rng=1)
+    (pool,) = roll.term_crits
+    assert pool.crits == pool.natural_max == roll.rolls.count(6)
+    assert pool.natural_ones == roll.rolls.count(1)
+
+
+def test_crit_counts():
+    counts = dice.CritCounts("1d20", 10, 2, 1, 3)
+    assert counts.crit_rate == 0.2
+    assert counts + counts == ("1d20", 20, 4, 2, 6)
+    assert dice.CritCounts.of(dice.TermCrit("1d20", True, 1, 0, 2)) == ("1d20", 1, 1, 0, 1)
+
+
+def test_roll_many_crits():
+    pytest.importorskip("numpy")
+    values, crits, (d20, d6) = dice.roll_many("A1d20+2d6", 100_000, seed=2, crit=20)
+    assert not crits.any()
+    assert d20.trials == 100_000
+    assert d20.crit_rate == pytest.approx(1 - 0.95 ** 2, abs=0.005)
+    assert d6.natural_max_rate == pytest.approx(1 - (5 / 6) ** 2, abs=0.01)
+    values, crits, _ = dice.roll_many("1d20+5", 1000, seed=2, crit=20)
+    assert (crits == (values == 25)).all()
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+import multi_dice as dice
+from multi_dice.parser import BinOp, Constant, parse_expression
+from multi_dice.pmf import tree_distribution
+from multi_dice.rng import StdlibRNG
+
+EXPRESSIONS = [
+    "((2+3)*4)+1d20", "(1d6)**1", "1d6+1d6+1d20", "1d20+1d20", "1d6+2+1d6-3", "5-1d6-1d6", "1d6*1+0",
+    "2**3**2+1d4", "1d6/2+1d6+1d6", "0+1*1d8**1", "3d4k2+3d4+3d4", "(1d4+1d4)*(2-1)", "1d6-(1d6+2)",
+    # Merging these would cross into bulk draws or histogram pools
+    "4d6+4d6+1d20", "3d6+5d6+1d8", "200d6+200d6+1d20",
+]
+
+
+def test_folds_constants_and_identities():
+    assert isinstance(dice.compile_dice("((2+3)*4)*2**3").tree, Constant)
+    assert repr(dice.compile_dice("(1d6)**1").tree) == "1d6"
+    assert repr(dice.compile_dice("1d6*1+0").tree) == "1d6"
+    assert repr(dice.compile_dice("((2+3)*4)+1d20").tree) == "(1d20+20)"
+    assert repr(dice.compile_dice("1d6+2+1d6-2+1d20").tree) == "(2d6+1d20)"
+    assert repr(dice.compile_dice("4d6+4d6+1d20").tree) == "((4d6+4d6)+1d20)"
+
+
+def test_left_to_roll_time():
+    assert isinstance(dice.compile_dice("1d6+5//0").tree, BinOp)
+    with pytest.raises(ZeroDivisionError):
+        dice.roll("1d6+5//0")
+
+
+@pytest.mark.parametrize("expression", EXPRESSIONS)
+def test_same_rolls(expression):
+    unfolded = parse_expression(expression)
+    compiled = dice.compile_dice(expression)
+    for seed in range(20):
+        expected: list = []
+        value = unfolded.roll(expected, StdlibRNG(random.Random(seed)))
+        folded_value, rolls, _ = compiled.roll(rng=seed)
+        assert folded_value == value
+        assert rolls == [roll for term in expected for roll in term]
+
+
+@pytest.mark.parametrize("expression", EXPRESSIONS)
+def test_same_distribution(expression):
+    assert tree_distribution(dice.compile_dice(expression).tree) == pytest.approx(
+        tree_distribution(parse_expression(expression)))
+
+
+def test_crit_of_last_term():
+    # 1d20+1d20 keeps the last die apart, constants after it do not reset the crit
+    for seed in range(50):
+        roll = dice.RollDice("1d20+1d20", rng=seed)
+        assert roll.crit == (roll.rolls[-1] == 20)
+        roll = dice.RollDice("1d20*1+1d20+3", rng=seed)
+        assert roll.crit == (roll.rolls[-1] == 20)
@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+import multi_dice as dice
+
+HEAVY = ["numpy", "asyncio", "sqlite3", "ast", "concurrent.futures", "multiprocessing", "hashlib"]
+
+
+def test_import_is_light():
+    # A fresh interpreter, the test session has already imported everything
+    code = f"import sys, multi_dice; multi_dice.roll('4d6k3'); print([m for m in {HEAVY!r} if m in sys.modules])"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)})
+    assert result.stdout.strip() == "[]"
+
+
+def test_lazy_names():
+    assert dice.distribution("1d2") == {1: 0.5, 2: 0.5}
+    assert callable(dice.roll_many) and callable(dice.simulate)
+    assert "prob_at_least" in dir(dice)
+    dice.validate_expression("2**3//2")
@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import multi_dice as dice
+from multi_dice import instrumentation
+
+
+def test_instrument_records_phases_and_counters():
+    dice.clear_cache()
+    with dice.instrument() as stats:
+        for expression in ("4d6k3+2", "4d6k3+2", "a1d20", "3000d6"):
+            dice.RollDice(expression).data
+    result = stats.to_dict()
+    assert {"compile", "roll", "rng", "pack", "stats"} <= set(result["phases"])
+    counters = result["counters"]
+    assert counters["cache_misses"] == 3
+    assert counters["cache_hits"] == 1
+    assert counters["rolls"] == 5
+    assert counters["dice_drawn"] == 4 + 4 + 2 + 3000
+    assert counters["expression_terms"] == 4
+
+
+def test_instrument_only_inside_block():
+    with dice.instrument() as stats:
+        dice.roll("1d20")
+    assert instrumentation.recorder.get() is None
+    before = stats.to_dict()
+    dice.roll("1d20")
+    assert stats.to_dict() == before
+
+
+def test_instrument_nested_restores_outer():
+    with dice.instrument() as outer:
+        with dice.instrument() as inner:
+            dice.roll("1d20")
+        assert instrumentation.recorder.get() is outer
+        dice.roll("1d20")
+    assert inner.counters["rolls"] == 1
+    assert outer.counters["rolls"] == 1
+
+
+def test_instrument_prometheus():
+    with dice.instrument() as stats:
+        dice.roll("2d6")
+    text = stats.to_prometheus()
+    assert '# TYPE multi_dice_phase_seconds summary' in text
+    assert 'multi_dice_phase_seconds_count{phase="roll"} 1' in text
+    assert "multi_dice_rolls_total 1" in text
+
+
+def test_instrument_ignores_other_threads():
+    with ThreadPoolExecutor(1) as pool:
+        with dice.instrument() as stats:
+            dice.roll("1d20")
+            pool.submit(dice.roll, "1d20").result()
+    assert stats.counters["rolls"] == 1
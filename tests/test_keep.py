@@ -0,0 +1,27 @@
+import random
+
+from multi_dice.keep import choose_keeper
+
+
+def test_keepers_match_sorting():
+    pools = [(4, 6, 3), (5, 6, 5), (10, 10, 1), (10, 10, 9), (100, 6, 50),
+             (1000, 1000, 3), (1000, 1000, 997), (1000, 20, 500), (200, 100, 100)]
+    for count, sides, keep in pools:
+        for highest in (True, False):
+            keeper = choose_keeper(count, sides, keep, highest)
+            for _ in range(20):
+                rolls = [random.randint(1, sides) for _ in range(count)]
+                assert keeper(rolls) == sum(sorted(rolls, reverse=highest)[:keep])
+
+
+def test_window_keeper():
+    for count, sides, keep in [(20000, 100000, 10000), (10000, 10000, 2000)]:
+        for highest in (True, False):
+            keeper = choose_keeper(count, sides, keep, highest)
+            rolls = [random.randint(1, sides) for _ in range(count)]
+            assert keeper(rolls) == sum(sorted(rolls, reverse=highest)[:keep])
+    # Rolls far from uniform put the cut outside the window
+    keeper = choose_keeper(20000, 1000, 10000, True)
+    rolls = [1000] * 5000 + [1] * 15000
+    assert keeper(rolls) == 5000 * 1000 + 5000
+    assert choose_keeper(20000, 1000, 10000, False)(rolls) == 10000
@@ -0,0 +1,74 @@
+import pytest
+import multi_dice as dice
+from multi_dice import montecarlo
+
+
+def test_simulate_stats():
+    result = dice.simulate("1d20", 200000, workers=1, seed=1)
+    assert result.trials == 200000
+    assert result.mean == pytest.approx(10.5, abs=0.1)
+    assert result.crit_rate == pytest.approx(0.05, abs=0.005)
+    assert result.percentile(50) in (10, 11)
+    assert set(result.summary()["percentiles"]) == {5, 25, 50, 75, 95}
+
+
+def test_simulate_needs_trials():
+    for trials, chunk in ((0, 100), (-5, 100), (10, 0)):
+        with pytest.raises(ValueError):
+            dice.simulate("1d20", trials, workers=1, chunk=chunk)
+
+
+def test_simulate_shards_by_dice_drawn(monkeypatch):
+    pytest.importorskip("numpy")
+    from multi_dice import vectorized
+    monkeypatch.setattr(vectorized, "DRAW_BUDGET", 1000)
+    shards: list = []
+    simulate_chunk = montecarlo.simulate_chunk
+
+    def recorded(dice, trials, *args):
+        shards.append(trials)
+        return simulate_chunk(dice, trials, *args)
+    monkeypatch.setattr(montecarlo, "simulate_chunk", recorded)
+    result = dice.simulate("100d6", 95, workers=1, seed=1)
+    assert result.trials == 95 and shards == [10] * 9 + [5]
+
+
+def test_simulate_reproducible_across_workers():
+    single = dice.simulate("a4d6k3+2", 40000, workers=1, seed=11, chunk=10000)
+    parallel = dice.simulate("a4d6k3+2", 40000, workers=2, seed=11, chunk=10000)
+    assert single.histogram == parallel.histogram
+    assert single.crits == parallel.crits
+
+
+def test_simulate_early_stop():
+    result = dice.simulate("2d6", 10_000_000, workers=1, seed=2, chunk=1000, ci_width=0.2)
+    assert result.stopped_early
+    assert result.trials < 10_000_000
+    low, high = result.confidence_interval()
+    assert high - low <= 0.2
+
+
+def test_simulate_without_numpy(monkeypatch):
+    monkeypatch.setattr(montecarlo, "np", None)
+    result = dice.simulate("A1d20", 2000, workers=1, seed=4)
+    assert result.trials == 2000
+    assert result.mean > 10.5
+    assert result.histogram == dice.simulate("A1d20", 2000, workers=1, seed=4).histogram
+
+
+def test_simulate_term_crits():
+    single = dice.simulate("1d20+1d4", 40000, workers=1, seed=5, chunk=10000)
+    d20, d4 = single.term_crits
+    assert d20.trials == d4.trials == 40000
+    assert d20.crit_rate == pytest.approx(0.05, abs=0.005)
+    assert d4.natural_one_rate == pytest.approx(0.25, abs=0.01)
+    assert single.crits == d4.crits == 0
+    assert single.summary()["term_crit_rates"][0]["dice"] == "1d20"
+    parallel = dice.simulate("1d20+1d4", 40000, workers=2, seed=5, chunk=10000)
+    assert parallel.term_crits == single.term_crits
+
+
+def test_simulate_term_crits_without_numpy(monkeypatch):
+    monkeypatch.setattr(montecarlo, "np", None)
+    (d20,) = dice.simulate("1d20", 4000, workers=1, seed=4).term_crits
+    assert d20.crits == d20.natural_max
@@ -0,0 +1,65 @@
+import pytest
+import multi_dice as dice
+from multi_dice.parser import BinOp, DiceTerm, parse_expression
+
+
+def test_precedence():
+    assert dice.roll("2+3*4") == 14
+    assert dice.roll("2**3**2") == 512
+    assert dice.roll("20-4-3") == 13
+    assert dice.roll("(1d1+1)*3") == 6
+    assert dice.roll("7//2+1d1") == 4
+
+
+def test_tree():
+    tree = parse_expression("4d6k3+A1d20")
+    assert isinstance(tree, BinOp)
+    assert isinstance(tree.right, DiceTerm)
+    assert tree.right.mode == "A"
+    assert (tree.left.count, tree.left.sides, tree.left.keep, tree.left.highest) == (4, 6, 3, True)
+
+
+def test_invalid_syntax():
+    for expression in ("1d6+", "(1d6", "1d6)", "*2", "()"):
+        with pytest.raises(SyntaxError):
+            dice.roll(expression)
+
+
+def test_modifiers():
+    term = parse_expression("4d6r1")
+    assert (term.reroll, term.reroll_once) == (1, False)
+    assert parse_expression("4d6ro2").reroll_once
+    assert parse_expression("6d6!").explode
+    assert (parse_expression("10d10>=7").success, parse_expression("10d10>=7").target) == (">=", 7)
+    assert repr(parse_expression("4d6dl1")) == "4d6k3"
+    assert repr(parse_expression("4d6dh1")) == "4d6l3"
+    assert repr(parse_expression("A2d4r1!")) == "A2d4r1!"
+
+
+def test_modifier_rolls():
+    for _ in range(200):
+        roll = dice.RollDice("4d6r2")
+        assert all(face > 2 for face in roll.rolls)
+        roll = dice.RollDice("10d10>=7")
+        assert roll.value == sum(face >= 7 for face in roll.rolls)
+        roll = dice.RollDice("3d4!")
+        assert len(roll.rolls) == 3 + sum(face == 4 for face in roll.rolls)
+        assert roll.value == sum(roll.rolls)
+    assert dice.roll("10d10k3>=1") == 3
+    assert dice.roll("10d10l3<=10") == 3
+    assert dice.roll("10d10l3>10") == 0
+
+
+def test_invalid_modifiers():
+    for expression in ("4d6r6", "1d1!", "4d6!k3", "4d6dl5", "4d6x", "4d6>="):
+        with pytest.raises(ValueError):
+            dice.roll(expression)
+
+
+def test_dice_without_sides():
+    for expression in ("1d0", "3d0+1", "1d0!"):
+        with pytest.raises(ValueError, match="at least one side"):
+            dice.roll(expression)
+    # No dice roll 0 whatever their sides
+    assert dice.roll("0d0") == 0
+    assert dice.roll("0d0+3") == 3
@@ -0,0 +1,121 @@
+import itertools
+import math
+
+import pytest
+import multi_dice as dice
+from multi_dice.pmf import (EXACT_WORK, keep_highest_moments, keep_highest_split_moments, term_moments,
+                             term_work)
+
+
+def test_exact_keep_and_advantage_stats():
+    roll = dice.RollDice("4d6k3")
+    assert roll.average == pytest.approx(dice.distribution("4d6k3").mean)
+    assert roll.variance == pytest.approx(dice.distribution("4d6k3").variance)
+    assert dice.RollDice("A1d20").average == pytest.approx(13.825)
+    assert dice.RollDice("d1d20").average == pytest.approx(7.175)
+    assert dice.RollDice("a1d20+2").average == pytest.approx(15.825)
+
+
+def test_stats_match_distribution():
+    for expression in ("2d6-1d4", "1d6//2", "(1d12+1d6)**2", "3d4*2+1", "1d8/1d4", "D2d6+4d4l2"):
+        pmf = dice.distribution(expression)
+        compiled = dice.compile_dice(expression)
+        assert compiled.average == pytest.approx(pmf.mean)
+        assert compiled.variance == pytest.approx(pmf.variance)
+        assert compiled.stdev == pytest.approx(math.sqrt(pmf.variance))
+        assert (compiled.minimum, compiled.maximum) == (pmf.minimum, pmf.maximum)
+
+
+def test_stats_past_float_range():
+    assert dice.RollDice("3**1d1000").average == pytest.approx(3 ** 500.5)
+    assert dice.RollDice("1d200**1d200").average == pytest.approx(100.5 ** 100.5)
+    roll = dice.RollDice("3**1d1000")
+    assert str(roll) and roll.data["minimum"] == 3
+
+
+def test_range_with_subtraction():
+    compiled = dice.compile_dice("1d20-2d6")
+    assert (compiled.minimum, compiled.maximum) == (-11, 18)
+
+
+def test_closed_form_sum():
+    assert term_moments(100_000, 6, 100_000, True, "") == (350_000, 100_000 * 35 / 12, 100_000, 600_000)
+
+
+def test_large_pool_stats():
+    assert dice.compile_dice("100000d6k10").average == pytest.approx(60)
+    assert dice.compile_dice("10d100k5").average == pytest.approx(366.128, abs=0.01)
+    assert dice.compile_dice("10d100l5").average == pytest.approx(505 - 366.128, abs=0.01)
+    sum_stdev = math.sqrt(100_000 * 35 / 12)
+    assert dice.compile_dice("A100000d6").average == pytest.approx(350_000 + sum_stdev / math.sqrt(math.pi))
+
+
+def test_large_keep_variance():
+    # Over the table cutoff, the kept total still matches the exact distribution
+    for expression in ("100d6k50", "100d6l50", "A100d6k50"):
+        assert term_work(*dice.compile_dice(expression).dice_terms[0].key) > EXACT_WORK
+        pmf = dice.distribution(expression)
+        compiled = dice.compile_dice(expression)
+        assert compiled.average == pytest.approx(pmf.mean)
+        assert compiled.variance == pytest.approx(pmf.variance, rel=1e-6)
+        assert (compiled.minimum, compiled.maximum) == (pmf.minimum, pmf.maximum)
+    assert dice.compile_dice("40d6k20").variance == pytest.approx(36.7502, abs=1e-4)
+
+
+def test_split_keep_moments():
+    die = {face: 1 / 6 for face in range(1, 7)}
+    assert keep_highest_split_moments(2000, die, 1000) == pytest.approx(keep_highest_moments(2000, die, 1000))
+    # Several faces near the cut, the pairs of them are approximated
+    die = {face: 1 / 20 for face in range(1, 21)}
+    assert keep_highest_split_moments(200, die, 100) == pytest.approx(keep_highest_moments(200, die, 100), rel=0.01)
+
+
+def test_big_few_sided_keep_stats():
+    pytest.importorskip("numpy")
+    values = dice.roll_many("10000d6k5000", 20_000, seed=4)
+    compiled = dice.compile_dice("10000d6k5000")
+    assert compiled.average == pytest.approx(values.mean(), abs=3)
+    assert compiled.stdev == pytest.approx(values.std(), rel=0.03)
+
+
+def test_stats_cached():
+    term_moments.cache_clear()
+    dice.compile_dice("6d8k2").average
+    dice.CompiledDice("6d8k2+1").average
+    assert term_moments.cache_info().hits == 1
+
+
+def brute_force(count, die, value=lambda faces: sum(faces)):
+    pmf: dict = {}
+    for faces in itertools.product(die, repeat=count):
+        chance = math.prod(die[face] for face in faces)
+        pmf[value(faces)] = pmf.get(value(faces), 0) + chance
+    return pmf
+
+
+def check_term(expression, expected):
+    pmf = dice.distribution(expression)
+    assert set(pmf) == set(expected)
+    for value, chance in expected.items():
+        assert pmf[value] == pytest.approx(chance)
+
+
+def test_modified_distributions():
+    d6 = dict.fromkeys(range(1, 7), 1 / 6)
+    once = {face: (face > 2) / 6 + 2 / 36 for face in range(1, 7)}
+    check_term("3d6r2", brute_force(3, dict.fromkeys(range(3, 7), 1 / 4)))
+    check_term("3d6ro2", brute_force(3, once))
+    check_term("4d6ro2k3", brute_force(4, once, lambda faces: sum(sorted(faces)[1:])))
+    check_term("4d6ro2l2", brute_force(4, once, lambda faces: sum(sorted(faces)[:2])))
+    check_term("5d6>=5", brute_force(5, d6, lambda faces: sum(face >= 5 for face in faces)))
+    check_term("5d6k2<3", brute_force(5, d6, lambda faces: sum(face < 3 for face in sorted(faces)[3:])))
+
+
+def test_exploding_stats():
+    pmf = dice.distribution("1d6!")
+    assert pmf[5] == pytest.approx(1 / 6)
+    assert pmf[6 + 6 + 2] == pytest.approx(1 / 216)
+    assert 6 not in pmf
+    assert dice.compile_dice("2d6!").average == pytest.approx(8.4)
+    assert dice.compile_dice("2d6!").maximum == 2 * 101 * 6
+    assert dice.compile_dice("1000d10!>=8").average == pytest.approx(1000 * 0.3 / 0.9)
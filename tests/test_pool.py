@@ -0,0 +1,62 @@
+import random
+
+import pytest
+import multi_dice as dice
+from multi_dice import pool, rng
+from multi_dice.parser import parse_term
+
+
+def check_pool_term(expression):
+    term = parse_term(expression)
+    assert term.histogram
+    for _ in range(100):
+        out = []
+        value = term.roll(out)
+        rolls = list(out[0])
+        assert len(rolls) == term.count
+        assert value == sum(sorted(rolls, reverse=term.highest)[:term.keep])
+
+
+def test_histogram_terms():
+    for expression in ("1000d6", "1000d6k3", "1000d20l997", "300d4k150"):
+        check_pool_term(expression)
+
+
+def test_histogram_without_numpy(monkeypatch):
+    monkeypatch.setattr(rng, "load_numpy", lambda: None)
+    check_pool_term("500d6k10")
+
+
+def test_multinomial_counts():
+    counts = rng.sample_counts(rng.StdlibRNG(random.Random(5)), 10000, 8)
+    assert counts[0] == 0
+    assert sum(counts) == 10000
+
+
+def test_lazy_rolls():
+    roll = dice.RollDice("5000d6k3")
+    assert isinstance(roll.term_rolls[0], pool.FacePool)
+    assert roll.value <= 18
+    assert len(roll.rolls) == 5000
+
+
+def test_pool_limits():
+    assert 10000 <= dice.roll("10000d6") <= 60000
+    with pytest.raises(ValueError):
+        dice.roll("100001d6")
+
+
+def test_zero_dice():
+    assert pool.highest_roll([]) == 0
+    roll = dice.RollDice("0d6")
+    assert (roll.value, roll.rolls, roll.crit, roll.average) == (0, [], False, 0)
+    assert dice.roll("0d6+1") == 1
+    assert dice.RollDice("0d6+1d20", rng=1).term_crits[0].crits == 0
+
+
+def test_zero_dice_many():
+    pytest.importorskip("numpy")
+    values, crits, (counts,) = dice.roll_many("0d6", 10, crit=20)
+    assert not values.any() and not crits.any()
+    assert counts == ("0d6", 10, 0, 0, 0)
+    assert not dice.roll_many("0d6!", 10, crit=6)[0].any()
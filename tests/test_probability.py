@@ -0,0 +1,97 @@
+import importlib
+import itertools
+from collections import Counter
+
+import pytest
+import multi_dice as dice
+
+
+def brute_force(number_of_dice, die_sides, k_value, highest):
+    counts = Counter()
+    for rolls in itertools.product(range(1, die_sides + 1), repeat=number_of_dice):
+        counts[sum(sorted(rolls, reverse=highest)[:k_value])] += 1
+    return {value: ways / die_sides ** number_of_dice for value, ways in counts.items()}
+
+
+def assert_same(pmf, expected):
+    assert set(pmf) == set(expected)
+    for value in expected:
+        assert pmf[value] == pytest.approx(expected[value])
+
+
+def test_sum_distribution():
+    assert_same(dice.distribution("3d4"), brute_force(3, 4, 3, True))
+
+
+def test_keep_distribution():
+    for number_of_dice, die_sides, k_value in ((4, 6, 3), (5, 4, 2), (3, 5, 1)):
+        assert_same(dice.distribution(f"{number_of_dice}d{die_sides}k{k_value}"),
+                    brute_force(number_of_dice, die_sides, k_value, True))
+        assert_same(dice.distribution(f"{number_of_dice}d{die_sides}l{k_value}"),
+                    brute_force(number_of_dice, die_sides, k_value, False))
+
+
+def test_advantage_distribution():
+    assert dice.distribution("A1d20").mean == pytest.approx(13.825)
+    assert dice.distribution("d1d20").mean == pytest.approx(7.175)
+    assert dice.distribution("a1d20+2")[22] == pytest.approx(39 / 400)
+
+
+def test_operator_distribution():
+    pmf = dice.distribution("1d2*10-1d2")
+    assert_same(pmf, {8: 0.25, 9: 0.25, 18: 0.25, 19: 0.25})
+    assert dice.distribution("7") == {7: 1.0}
+
+
+def test_distribution_stats():
+    pmf = dice.distribution("2d6")
+    assert sum(pmf.values()) == pytest.approx(1)
+    assert pmf.mean == pytest.approx(7)
+    assert pmf.variance == pytest.approx(35 / 6)
+    assert pmf.at_least(12) == pytest.approx(1 / 36)
+    assert pmf.percentile(50) == 7
+    assert (pmf.minimum, pmf.maximum) == (2, 12)
+
+
+def test_distribution_work_limit():
+    with pytest.raises(ValueError, match="too expensive"):
+        dice.distribution("1000d1000k500")
+
+
+def test_probability_queries():
+    assert dice.prob_at_least("1d20", 11) == pytest.approx(0.5)
+    assert dice.prob_at_least("1d20", 21) == 0
+    assert dice.prob_at_least("1d20", -5) == 1
+    assert dice.prob_at_least("a1d20+2", 22) == pytest.approx(39 / 400)
+    assert dice.percentile("2d6", 50) == 7
+    assert dice.percentile("1d20", 100) == 20
+    assert dice.cdf("1d4") == pytest.approx({1: 0.25, 2: 0.5, 3: 0.75, 4: 1.0})
+
+
+def test_upper_tail_is_exact():
+    # Past the maximum the chance is exactly 0, with no residue from summing the lower tail
+    assert dice.prob_at_least("10d10>=7", 15) == 0.0
+    assert dice.prob_at_least("10d10>=7", 10) == pytest.approx(0.4 ** 10, rel=1e-12)
+
+
+def test_compare():
+    # Opposed d20 rolls tie 1 in 20 times
+    assert dice.compare("1d20", "1d20") == pytest.approx(0.475)
+    assert dice.compare("1d20+1", "1d20") == pytest.approx(0.525)
+    assert dice.compare("1d4", "10") == 0
+
+
+def test_queries_cached():
+    assert dice.distribution("3d6") is dice.distribution(" 3d6 ")
+    pmf = dice.distribution("3d6")
+    for target in range(3, 19):
+        assert dice.prob_at_least("3d6", target) == pytest.approx(
+            sum(probability for value, probability in pmf.items() if value >= target))
+
+
+def test_monte_carlo_fallback(monkeypatch):
+    module = importlib.import_module("multi_dice.probability")
+    monkeypatch.setattr(module, "QUERY_EXACT_WORK", 0)
+    module.query_distribution.cache_clear()
+    assert dice.prob_at_least("2d6+1d8", 12) == pytest.approx(dice.distribution("2d6+1d8").at_least(12), abs=0.01)
+    module.query_distribution.cache_clear()
@@ -0,0 +1,77 @@
+import itertools
+import random
+import secrets
+from collections import Counter
+
+import pytest
+import multi_dice as dice
+
+
+def test_seeded_rolls_repeat():
+    first = dice.RollDice("a4d6k3+1d20", rng=random.Random(42))
+    second = dice.RollDice("a4d6k3+1d20", rng=random.Random(42))
+    assert (first.value, first.rolls) == (second.value, second.rolls)
+    assert dice.roll("10d10", rng=7) == dice.roll("10d10", rng=7)
+
+
+def test_backends_roll_in_range():
+    backends = [random.Random(1), secrets.SystemRandom(), dice.BufferedRandom(), dice.BufferedRandom(3)]
+    for backend in backends:
+        for _ in range(200):
+            assert 3 <= dice.roll("3d6", rng=backend) <= 18
+            assert 1 <= dice.roll("1d1000", rng=backend) <= 1000
+
+
+def test_buffered_random_seeded():
+    first = dice.BufferedRandom(seed=9, chunk=64)
+    second = dice.BufferedRandom(seed=9, chunk=64)
+    assert [first.faces(7, 12) for _ in range(50)] == [second.faces(7, 12) for _ in range(50)]
+
+
+def test_faces_are_uniform():
+    for backend in (dice.as_rng(random.Random(2)), dice.BufferedRandom(2)):
+        faces = Counter(backend.faces(60000, 6))
+        assert set(faces) == {1, 2, 3, 4, 5, 6}
+        assert all(9000 < count < 11000 for count in faces.values())
+
+
+def test_numpy_generator():
+    np = pytest.importorskip("numpy")
+    value = dice.roll("4d6k3", rng=np.random.default_rng(1))
+    assert value == dice.roll("4d6k3", rng=np.random.default_rng(1))
+    assert (dice.roll_many("2d6", 10, rng=random.Random(4)) == dice.roll_many("2d6", 10, rng=random.Random(4))).all()
+
+
+def test_unsupported_rng():
+    with pytest.raises(TypeError):
+        dice.roll("1d6", rng="not a generator")
+
+
+def test_secure_sources_skip_numpy(monkeypatch):
+    source = secrets.SystemRandom()
+    assert dice.as_rng(source).secure and dice.BufferedRandom().secure
+    assert not dice.as_rng(1).secure and not dice.BufferedRandom(seed=1).secure
+    monkeypatch.setattr("multi_dice.rng.load_numpy", lambda: pytest.fail("seeded NumPy from a secure source"))
+    assert 1000 <= dice.roll("1000d6", rng=source) <= 6000
+    assert sum(dice.as_rng(source).counts(1000, 6)) == 1000
+
+
+def test_roll_many_secure_source(monkeypatch):
+    pytest.importorskip("numpy")
+    from multi_dice import stream, vectorized
+    for module in (vectorized, stream):
+        monkeypatch.setattr(module, "numpy_generator", lambda *args: pytest.fail("seeded NumPy from a secure source"))
+    values = dice.roll_many("2d6", 100, rng=secrets.SystemRandom())
+    assert values.shape == (100,) and ((2 <= values) & (values <= 12)).all()
+    values, crits, (counts,) = dice.roll_many("1d20", 100, rng=secrets.SystemRandom(), crit=20)
+    assert (crits == (values == 20)).all() and counts.trials == 100
+    assert len(list(itertools.islice(dice.roll_stream("1d20", rng=secrets.SystemRandom()), 10))) == 10
+
+
+def test_backend_without_faces_fails_when_created():
+    class Incomplete(dice.RNGBackend):
+        def randint(self, a, b):
+            return a
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,71 @@
+import asyncio
+import secrets
+
+import pytest
+import multi_dice as dice
+from multi_dice.rng import BufferedRandom
+from multi_dice.vectorized import is_secure
+
+
+def test_requests_are_batched():
+    async def main():
+        roller = dice.AsyncDiceRoller(rng=1)
+        values = await asyncio.gather(*(roller.roll("2d6+1") for _ in range(100)))
+        return roller, values
+
+    roller, values = asyncio.run(main())
+    assert roller.batches == 1
+    assert all(3 <= value <= 13 for value in values)
+    assert roller.stats()["2d6+1"]["count"] == 100
+
+
+def test_heavy_batches_are_offloaded():
+    async def main():
+        roller = dice.AsyncDiceRoller(offload_dice=0)
+        return await asyncio.gather(*(roller.roll(expression) for expression in ("4d6k3", "a1d20", "4d6k3")))
+
+    first, second, third = asyncio.run(main())
+    assert 3 <= first <= 18 and 1 <= second <= 20 and 3 <= third <= 18
+
+
+def test_errors_reach_callers():
+    async def main():
+        roller = dice.AsyncDiceRoller()
+        with pytest.raises(ValueError):
+            await roller.roll("2d6k3")
+        with pytest.raises(ZeroDivisionError):
+            await roller.roll("1d6//0")
+
+    asyncio.run(main())
+
+
+def test_equivalent_strings_share_a_batch():
+    async def main():
+        roller = dice.AsyncDiceRoller(rng=3)
+        values = await asyncio.gather(roller.roll("1d6+2"), roller.roll("2+1d6"), roller.roll(" 1d6 + 2 "))
+        return roller, values
+
+    roller, values = asyncio.run(main())
+    assert roller.batches == 1
+    assert all(3 <= value <= 8 for value in values)
+
+
+def test_secure_batches_skip_numpy_seeds(monkeypatch):
+    calls = []
+
+    def fake_roll_many(dice, n, seed=None, rng=None):
+        calls.append((seed, rng))
+        return [1] * n
+
+    monkeypatch.setattr("multi_dice.service.roll_many", fake_roll_many)
+
+    async def main(rng, offload_dice):
+        roller = dice.AsyncDiceRoller(rng=rng, offload_dice=offload_dice)
+        return await asyncio.gather(roller.roll("1d6"), roller.roll("1d6"))
+
+    source = secrets.SystemRandom()
+    assert asyncio.run(main(source, 1000)) == [1, 1]
+    assert asyncio.run(main(BufferedRandom(), 1000)) == [1, 1]
+    assert asyncio.run(main(source, 0)) == [1, 1]
+    assert len(calls) == 3
+    assert all(seed is None and is_secure(rng) for seed, rng in calls)
@@ -0,0 +1,54 @@
+import pytest
+import multi_dice as dice
+from multi_dice.store import DistributionCache
+
+
+def test_memory_hits_and_misses():
+    cache = DistributionCache()
+    calls = []
+
+    def compute(key):
+        calls.append(key)
+        return {1: 0.5, 2: 0.5}
+
+    assert cache.get("1d2", compute) is cache.get("1d2", compute)
+    assert calls == ["1d2"]
+    assert cache.info()["hits"] == 1 and cache.info()["misses"] == 1
+
+
+def test_size_eviction():
+    cache = DistributionCache(max_entries=2, max_values=5)
+    for sides in (2, 3, 4):
+        cache.get(f"1d{sides}", lambda key: dict.fromkeys(range(1, int(key[2:]) + 1), 0.1))
+    info = cache.info()
+    assert info["entries"] == 1 and info["values"] == 4
+    assert info["evictions"] == 2
+
+
+def test_persistent_store(tmp_path):
+    path = tmp_path / "distributions.sqlite"
+    first = dice.set_distribution_cache(path)
+    try:
+        expected = dice.distribution("20d10k10")
+        assert dice.distribution_cache_info()["misses"] == 1
+
+        # A fresh process reads the distribution back from the file
+        second = dice.set_distribution_cache(path)
+        restored = dice.distribution("20d10k10")
+        assert restored == expected
+        assert isinstance(restored, dice.Distribution)
+        assert restored.at_least(60) == pytest.approx(expected.at_least(60))
+        assert second.info()["disk_hits"] == 1 and second.info()["misses"] == 0
+    finally:
+        first.close()
+        dice.set_distribution_cache()
+
+
+def test_disk_trimmed(tmp_path):
+    cache = DistributionCache(tmp_path / "distributions.sqlite", max_disk_bytes=200)
+    for sides in (4, 6, 8, 10, 12):
+        cache.get(f"3d{sides}", dice.distribution)
+    stored = cache.connection.execute("SELECT key FROM distributions").fetchall()
+    assert 0 < len(stored) < 5
+    assert ("3d12",) in stored
+    cache.close()
@@ -0,0 +1,43 @@
+import asyncio
+import itertools
+import random
+
+import multi_dice as dice
+from multi_dice import stream
+
+
+def check_stream(rolls):
+    for roll in rolls:
+        assert 1 <= roll.value <= 20
+        assert roll.crit == (roll.value == 20)
+
+
+def test_roll_stream():
+    check_stream(itertools.islice(dice.roll_stream("a1d20", chunk=100), 1000))
+    assert all(6 <= roll.value <= 25 and roll.crit == (roll.value == 25)
+               for roll in itertools.islice(dice.roll_stream("1d20+5"), 500))
+
+
+def test_roll_stream_seeded():
+    first = list(itertools.islice(dice.roll_stream("4d6k3", rng=random.Random(3), chunk=64), 200))
+    second = list(itertools.islice(dice.roll_stream("4d6k3", rng=random.Random(3), chunk=64), 200))
+    assert first == second
+
+
+def test_roll_stream_without_numpy(monkeypatch):
+    monkeypatch.setattr(stream, "np", None)
+    check_stream(itertools.islice(dice.roll_stream("A1d20", chunk=50), 300))
+
+
+def test_aroll_stream():
+    async def take(n):
+        rolls = []
+        async for roll in dice.aroll_stream("d1d20", chunk=128):
+            rolls.append(roll)
+            if len(rolls) == n:
+                break
+        return rolls
+
+    rolls = asyncio.run(take(1000))
+    assert len(rolls) == 1000
+    check_stream(rolls)
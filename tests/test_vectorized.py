@@ -0,0 +1,78 @@
+import pytest
+import multi_dice as dice
+from multi_dice import vectorized
+
+
+def check_many(values, n, low, high):
+    assert len(values) == n
+    assert all(low <= value <= high for value in values)
+
+
+def test_roll_many():
+    pytest.importorskip("numpy")
+    values = dice.roll_many("8d6+1d4", 1000)
+    check_many(values.tolist(), 1000, 9, 52)
+
+
+def test_roll_many_keep_and_advantage():
+    pytest.importorskip("numpy")
+    check_many(dice.roll_many("4d6k3+2", 1000).tolist(), 1000, 5, 20)
+    check_many(dice.roll_many("A10d10l2", 1000).tolist(), 1000, 2, 20)
+    advantage = dice.roll_many("a1d20", 100000, seed=3).mean()
+    disadvantage = dice.roll_many("d1d20", 100000, seed=3).mean()
+    assert disadvantage < 10.5 < advantage
+
+
+def test_roll_many_keep_nothing():
+    pytest.importorskip("numpy")
+    assert dice.roll_many("4d6k0", 3).tolist() == [0, 0, 0]
+    assert dice.roll_many("4d6l0+1", 3).tolist() == [1, 1, 1]
+    values, _, (counts,) = dice.roll_many("A4d6k0", 100, crit=6)
+    assert not values.any() and counts.natural_max > 0
+
+
+def test_roll_many_seed():
+    pytest.importorskip("numpy")
+    assert (dice.roll_many("3d6", 100, seed=7) == dice.roll_many("3d6", 100, seed=7)).all()
+
+
+def test_roll_many_pow_is_exact():
+    pytest.importorskip("numpy")
+    assert dice.roll_many("1d1*1000**7", 2).tolist() == [1000 ** 7, 1000 ** 7]
+
+
+def test_roll_many_product_is_exact():
+    pytest.importorskip("numpy")
+    expression = "(1000d1000)*(1000d1000)*(1000d1000)*(1000d1000)"
+    values = dice.roll_many(expression, 50, seed=1).tolist()
+    assert all(1000 ** 4 <= value <= 10 ** 24 for value in values)
+    assert max(values) > 2 ** 63
+    assert dice.roll_many("1d1*3037000500+1d1*3037000500**2", 2).tolist() == [3037000500 * 3037000501] * 2
+    assert dice.roll_many("3d6*2-1", 10).dtype.kind == "i"
+
+
+def test_roll_many_fallback(monkeypatch):
+    monkeypatch.setattr(vectorized, "np", None)
+    values = dice.roll_many("a4d6k3+2", 1000)
+    assert isinstance(values, list)
+    check_many(values, 1000, 5, 20)
+    assert dice.roll_many("3d6", 100, seed=7) == dice.roll_many("3d6", 100, seed=7)
+
+
+def test_roll_many_modifiers():
+    pytest.importorskip("numpy")
+    for expression in ("4d6r1", "4d6ro1k3", "3d6!", "10d10>=7", "10d10l5>=7", "2d4r1!>=4", "1000d6r2", "300d6k3>=5"):
+        compiled = dice.compile_dice(expression)
+        values = dice.roll_many(expression, 100_000, seed=5)
+        # Within five standard errors
+        assert values.mean() == pytest.approx(compiled.average, abs=5 * compiled.stdev / 316 + 1e-9)
+        assert values.var() == pytest.approx(compiled.variance, rel=0.05, abs=0.01)
+
+
+def test_roll_many_in_chunks(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(vectorized, "DRAW_BUDGET", 100)
+    values = dice.roll_many("30d6", 50, seed=1)
+    assert values.shape == (50,) and ((30 <= values) & (values <= 180)).all()
+    values, crits, (counts,) = dice.roll_many("30d20", 50, seed=1, crit=20)
+    assert len(values) == len(crits) == counts.trials == 50